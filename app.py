@@ -4,15 +4,18 @@ import streamlit as st
 from dotenv import load_dotenv
 
 load_dotenv()
-from src.document_loader import load_and_chunk
-from src.vector_store import PineconeVectorStore
+from src.document_loader import file_content_hash
+from src.ingest import IngestionWorker
+from src.vector_store import get_vector_store
 from src.rag_chain import RAGChain
 from src.database import ChatDatabase
+from src.retention import RetentionWorker, retention_days
+from src import tracing, warmup
+import json
 import os
+import shutil
 import uuid
 from datetime import datetime
-from pinecone import Pinecone
-import time
 
 # Page config
 st.set_page_config(
@@ -200,24 +203,51 @@ def get_database():
 
 db = get_database()
 
-# Initialize Pinecone check with loading state
+# One vector store and RAG chain per process, shared by every session (and
+# the ingestion worker), so all of them reuse the same API clients and pools
+@st.cache_resource
+def get_shared_vector_store():
+    return get_vector_store()
+
+@st.cache_resource
+def get_shared_rag_chain():
+    rag_chain = RAGChain()
+    # Load SDKs and build API clients while the first page renders
+    warmup.start(get_shared_vector_store(), rag_chain)
+    return rag_chain
+
+# Background ingestion; requeues jobs interrupted by a restart
+@st.cache_resource
+def get_ingestion_worker():
+    worker = IngestionWorker(get_shared_vector_store(), db)
+    worker.start()
+    return worker
+
+worker = get_ingestion_worker()
+
+# Daily archiving of idle sessions and chat database compaction
+@st.cache_resource
+def get_retention_worker():
+    retention = RetentionWorker(
+        db,
+        retention_days(),
+        os.getenv('HISTORY_ARCHIVE_DIR', 'chat_archive'),
+        interval=float(os.getenv('COMPACTION_INTERVAL_HOURS', '24')) * 3600
+    )
+    retention.start()
+    return retention
+
+get_retention_worker()
+
+# Prometheus/JSON scrape endpoint (only when NYANTA_METRICS_PORT is set)
+tracing.start_metrics_server()
+
+# Initialize index check with loading state
 @st.cache_data(ttl=60, show_spinner=False)
-def check_pinecone_documents():
-    """Check if documents exist in Pinecone."""
+def check_indexed_documents(_vector_store):
+    """Check if documents exist in the vector store."""
     try:
-        # Get API key (prioritize .env/os.getenv to avoid Streamlit secrets warning)
-        pinecone_key = os.getenv('PINECONE_API_KEY')
-        if not pinecone_key:
-            try:
-                if hasattr(st, 'secrets') and 'PINECONE_API_KEY' in st.secrets:
-                    pinecone_key = st.secrets['PINECONE_API_KEY']
-            except:
-                pass
-        
-        pc = Pinecone(api_key=pinecone_key)
-        index = pc.Index("rag-chatbot")
-        stats = index.describe_index_stats()
-        vector_count = stats.get('total_vector_count', 0)
+        vector_count = _vector_store.count()
         return vector_count > 0, vector_count
     except Exception as e:
         return False, 0
@@ -230,23 +260,118 @@ if 'session_id' not in st.session_state:
     else:
         st.session_state.session_id = str(uuid.uuid4())
 
-# Initialize session state
+# Initialize session state (clients connect lazily, so this doesn't block rendering)
 if 'vector_store' not in st.session_state:
-    with st.spinner("Initializing AI system..."):
-        st.session_state.vector_store = PineconeVectorStore()
+    st.session_state.vector_store = get_shared_vector_store()
 
 if 'rag_chain' not in st.session_state:
-    st.session_state.rag_chain = RAGChain()
+    st.session_state.rag_chain = get_shared_rag_chain()
+
+# Messages drawn per page of chat history; older pages load on request
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '20'))
+
+def load_history_page(before_id=None):
+    """One page of this session's messages, oldest first, and whether older ones exist."""
+    page = db.load_messages(st.session_state.session_id, limit=HISTORY_PAGE_SIZE + 1, before_id=before_id)
+    # The extra message only tells us there is more
+    if len(page) > HISTORY_PAGE_SIZE:
+        return page[1:], True
+    return page, False
+
+def reset_history():
+    """Start the chat window over at the newest page of the current session."""
+    st.session_state.chat_history, st.session_state.history_more = load_history_page()
+    st.session_state.history_window = HISTORY_PAGE_SIZE
+
+def load_earlier_messages():
+    """Prepend the page before the oldest message in the window."""
+    history = st.session_state.chat_history
+    page, st.session_state.history_more = load_history_page(before_id=history[0]["id"])
+    history[:0] = page
+    st.session_state.history_window += len(page)
 
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = db.load_messages(st.session_state.session_id)
+    reset_history()
 
 if 'documents_indexed' not in st.session_state:
-    has_docs, _ = check_pinecone_documents()
-    st.session_state.documents_indexed = has_docs
+    # Local records answer this without a round trip to the vector store
+    if db.get_document_stats()["total_documents"] > 0:
+        st.session_state.documents_indexed = True
+    else:
+        has_docs, _ = check_indexed_documents(st.session_state.vector_store)
+        st.session_state.documents_indexed = has_docs
+
+if 'announced_jobs' not in st.session_state:
+    # Jobs that finished before this browser session started aren't announced
+    st.session_state.announced_jobs = {
+        job['id'] for job in db.get_jobs(st.session_state.session_id)
+        if job['status'] in ('done', 'failed')
+    }
+    st.session_state.job_notices = []
+
+JOB_FILE_ICONS = {
+    'pending': '⏳',
+    'indexing': '🔮',
+    'done': '✅',
+    'skipped': '⏭️',
+    'failed': '❌'
+}
+
+def render_ingestion_jobs(jobs):
+    """Per-file progress of running jobs; announces jobs that just finished."""
+    for job in jobs:
+        files = job['files']
+        if job['status'] in ('queued', 'running'):
+            finished = sum(f['status'] in ('done', 'skipped', 'failed') for f in files)
+            st.progress(finished / max(len(files), 1),
+                        text=f"⚡ Processing {finished}/{len(files)} files")
+            for f in files:
+                detail = f" • {f['chunk_count']:,} chunks" if f['chunk_count'] else ""
+                st.caption(f"{JOB_FILE_ICONS.get(f['status'], '')} {f['filename']}{detail}")
+        elif job['id'] not in st.session_state.announced_jobs:
+            st.session_state.announced_jobs.add(job['id'])
+            st.session_state.job_notices.append(job)
+            if any(f['status'] == 'done' for f in files):
+                st.session_state.documents_indexed = True
+                check_indexed_documents.clear()
+    
+    if st.session_state.job_notices:
+        # Rerun the whole page so the stats and chat input catch up
+        st.rerun()
+
+def show_job_notices():
+    """Outcome of jobs that finished since the last full run."""
+    notices, st.session_state.job_notices = st.session_state.job_notices, []
+    for job in notices:
+        files = job['files']
+        indexed = [f for f in files if f['status'] == 'done']
+        for f in files:
+            if f['status'] == 'failed':
+                st.toast(f"Error: {f['filename']} - {f['error']}", icon="❌")
+        if job['status'] == 'failed':
+            st.error(f"❌ {job['error']}")
+        elif indexed:
+            total_chunks = sum(f['chunk_count'] for f in indexed)
+            st.success(f"🎉 Indexed {total_chunks:,} chunks from {len(indexed)} files!")
+            st.balloons()
+        elif all(f['status'] == 'skipped' for f in files):
+            st.info("All files are already indexed, nothing to do.")
+
+def ingestion_progress():
+    render_ingestion_jobs(db.get_jobs(st.session_state.session_id, limit=3))
+
+def vector_db_label():
+    """The configured vector store backend, for the Tech Stack panel."""
+    backend = os.getenv('VECTOR_STORE_BACKEND', 'pinecone').lower()
+    if backend == 'pinecone':
+        return "Pinecone Serverless"
+    label = "Local (memory-mapped NumPy)"
+    if backend == 'quantized':
+        label = f"Local ({os.getenv('VECTOR_QUANTIZATION', 'int8').lower()} quantized, exact rescoring)"
+    if os.getenv('ANN_INDEX', 'false').lower() == 'true':
+        label += " + IVF index"
+    return label
 
-if 'processing' not in st.session_state:
-    st.session_state.processing = False
 
 # Header with gradient
 st.markdown('<h1 class="main-header"> Nyanta </h1>', unsafe_allow_html=True)
@@ -267,12 +392,15 @@ with st.sidebar:
         label_visibility="collapsed"
     )
     
+    jobs = db.get_jobs(st.session_state.session_id, limit=3)
+    job_active = any(job['status'] in ('queued', 'running') for job in jobs)
+    
     # Process button with loading state
     if uploaded_files:
         process_button = st.button(
             f"📥 Process {len(uploaded_files)} {'file' if len(uploaded_files) == 1 else 'files'}", 
             type="primary",
-            disabled=st.session_state.processing,
+            disabled=job_active,
             use_container_width=True
         )
     else:
@@ -284,73 +412,38 @@ with st.sidebar:
         process_button = False
     
     if process_button and uploaded_files:
-        st.session_state.processing = True
-        
-        # Professional progress indicator
-        progress_container = st.container()
-        
-        with progress_container:
-            progress_bar = st.progress(0)
-            status = st.empty()
+        try:
+            # Save uploads, then hand them to the background worker
+            os.makedirs("documents", exist_ok=True)
+            files = []
+            for file in uploaded_files:
+                file_path = f"documents/{file.name}"
+                with open(file_path, "wb") as f:
+                    file.seek(0)
+                    shutil.copyfileobj(file, f)
+                files.append({
+                    "filename": file.name,
+                    "file_path": file_path,
+                    "file_size": file.size,
+                    "file_hash": file_content_hash(file_path)
+                })
             
-            try:
-                os.makedirs("documents", exist_ok=True)
-                all_chunks = []
-                total_files = len(uploaded_files)
-                
-                for idx, file in enumerate(uploaded_files):
-                    # Update status with emoji
-                    status.markdown(f"⚡ Processing **{file.name}**...")
-                    progress_bar.progress((idx) / total_files)
-                    
-                    file_path = f"documents/{file.name}"
-                    with open(file_path, "wb") as f:
-                        f.write(file.getvalue())
-                    
-                    try:
-                        chunks = load_and_chunk(file_path)
-                        all_chunks.extend(chunks)
-                        
-                        db.save_document(
-                            filename=file.name,
-                            file_size=file.size,
-                            chunk_count=len(chunks)
-                        )
-                        
-                        st.toast(f"✓ {file.name} processed", icon="✅")
-                        
-                    except Exception as e:
-                        st.toast(f"Error: {file.name} - {str(e)}", icon="❌")
-                
-                if all_chunks:
-                    status.markdown(f"🔮 Creating embeddings for **{len(all_chunks):,} chunks**...")
-                    progress_bar.progress(0.9)
-                    
-                    st.session_state.vector_store.create_index(all_chunks)
-                    st.session_state.documents_indexed = True
-                    
-                    progress_bar.progress(1.0)
-                    time.sleep(0.5)
-                    
-                    status.markdown("")
-                    progress_bar.empty()
-                    
-                    st.success(f"🎉 Indexed {len(all_chunks):,} chunks from {total_files} files!")
-                    check_pinecone_documents.clear()
-                    
-                    st.balloons()
-                    
-            except Exception as e:
-                st.error(f"❌ {str(e)}")
-            finally:
-                st.session_state.processing = False
+            worker.submit(st.session_state.session_id, files)
+            st.rerun()
+        except Exception as e:
+            st.error(f"❌ {str(e)}")
+    
+    show_job_notices()
+    
+    # Poll the job tables only while something is being processed
+    st.fragment(ingestion_progress, run_every=2 if job_active else None)()
     
     st.markdown("---")
     
     # Premium statistics design
     st.markdown("### 📊 Knowledge Base")
     
-    has_docs, vector_count = check_pinecone_documents()
+    has_docs, vector_count = check_indexed_documents(st.session_state.vector_store)
     doc_stats = db.get_document_stats()
     
     if has_docs:
@@ -389,17 +482,18 @@ with st.sidebar:
     with col1:
         if st.button("✨ New Chat", use_container_width=True, help="Start a fresh conversation"):
             st.session_state.session_id = str(uuid.uuid4())
-            st.session_state.chat_history = []
+            reset_history()
             st.rerun()
     
     with col2:
         if st.button("🗑️ Clear", use_container_width=True, help="Clear current conversation"):
             db.clear_session(st.session_state.session_id)
-            st.session_state.chat_history = []
+            reset_history()
             st.rerun()
     
     # Session metadata
-    message_count = len(st.session_state.chat_history)
+    session = db.get_session(st.session_state.session_id)
+    message_count = session["message_count"] if session else 0
     if message_count > 0:
         st.caption(f"💬 {message_count} messages in this session")
     st.caption(f"🔑 {st.session_state.session_id[:12]}")
@@ -408,11 +502,11 @@ with st.sidebar:
     
     # Tech stack
     with st.expander("⚙️ Tech Stack", expanded=False):
-        st.markdown("""
+        st.markdown(f"""
         **AI & ML**
         - LLM: Groq Llama 3.3 70B
         - Embeddings: OpenAI text-embedding-3
-        - Vector DB: Pinecone Serverless
+        - Vector DB: {vector_db_label()}
         
         **Backend**
         - Framework: LangChain
@@ -425,6 +519,26 @@ with st.sidebar:
         - Source Citations
         - Session Persistence
         """)
+    
+    # Per-stage latency (enabled with NYANTA_TRACING=true)
+    if tracing.enabled():
+        with st.expander("⏱️ Performance", expanded=False):
+            spans = tracing.snapshot()
+            if spans:
+                st.dataframe(
+                    [{"span": name, **stats} for name, stats in spans.items()],
+                    hide_index=True,
+                    use_container_width=True
+                )
+                st.download_button(
+                    "Download JSON",
+                    json.dumps(spans, indent=2),
+                    file_name="nyanta_metrics.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+            else:
+                st.caption("No spans recorded yet")
 
 # Main chat interface
 st.markdown("### 💬 Chat")
@@ -439,8 +553,19 @@ if not st.session_state.chat_history:
     </div>
     """, unsafe_allow_html=True)
 
+# Draw only the newest window of messages, so a rerun costs the same however long the chat is
+history = st.session_state.chat_history
+if len(history) > st.session_state.history_window:
+    # Messages scrolled out stay in the database and come back with "Load earlier"
+    del history[:-st.session_state.history_window]
+    st.session_state.history_more = True
+
+if st.session_state.history_more:
+    st.button("⬆️ Load earlier messages", use_container_width=True, key="load_earlier",
+              on_click=load_earlier_messages)
+
 # Display chat history with animations
-for idx, message in enumerate(st.session_state.chat_history):
+for idx, message in enumerate(history):
     with st.chat_message(message["role"], avatar="👤" if message["role"] == "user" else "🧠"):
         st.markdown(message["content"])
         
@@ -466,75 +591,72 @@ if prompt := st.chat_input(
         "timestamp": datetime.now().isoformat()
     }
     st.session_state.chat_history.append(user_message)
-    db.save_message(st.session_state.session_id, "user", prompt)
+    user_message["id"] = db.save_message(st.session_state.session_id, "user", prompt)
     
     with st.chat_message("user", avatar="👤"):
         st.markdown(prompt)
     
-    # Generate response with typing indicator
+    # Generate response, streaming tokens as they arrive
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Simulate thinking (brief)
-                time.sleep(0.3)
-                
-                # Search
+        try:
+            # Search
+            with st.spinner("Searching your documents..."):
                 results = st.session_state.vector_store.search(prompt, k=3)
+            
+            if not results:
+                response_text = "I couldn't find relevant information in your documents. Try rephrasing or uploading more content."
+                st.markdown(response_text)
                 
-                if not results:
-                    response_text = "I couldn't find relevant information in your documents. Try rephrasing or uploading more content."
-                    st.markdown(response_text)
-                    
-                    assistant_message = {
-                        "role": "assistant",
-                        "content": response_text,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    st.session_state.chat_history.append(assistant_message)
-                    db.save_message(st.session_state.session_id, "assistant", response_text)
-                else:
-                    # Generate answer
-                    response = st.session_state.rag_chain.query(prompt, results)
-                    
-                    # Display with smooth animation
-                    st.markdown(response['answer'])
-                    
-                    # Sources in professional format
-                    if response['sources']:
-                        with st.expander(f"📚 {len(response['sources'])} sources", expanded=False):
-                            for i, source in enumerate(response['sources'], 1):
-                                st.markdown(f"**{i}. {source['source']}** • Chunk {source['chunk_id']}")
-                                with st.container():
-                                    st.code(source['content'], language=None)
-                                if i < len(response['sources']):
-                                    st.markdown("---")
-                    
-                    # Save to history
-                    assistant_message = {
-                        "role": "assistant",
-                        "content": response['answer'],
-                        "sources": response['sources'],
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    st.session_state.chat_history.append(assistant_message)
-                    db.save_message(
-                        st.session_state.session_id, 
-                        "assistant", 
-                        response['answer'],
-                        response['sources']
-                    )
-                    
-            except Exception as e:
-                error_msg = f"⚠️ Something went wrong. Please try again.\n\nError: {str(e)}"
-                st.error(error_msg)
+                assistant_message = {
+                    "role": "assistant",
+                    "content": response_text,
+                    "timestamp": datetime.now().isoformat()
+                }
+                st.session_state.chat_history.append(assistant_message)
+                assistant_message["id"] = db.save_message(st.session_state.session_id, "assistant", response_text)
+            else:
+                rag_chain = st.session_state.rag_chain
+                sources = rag_chain.format_sources(results)
+                
+                # Render the answer incrementally
+                answer = st.write_stream(rag_chain.stream_query(prompt, results))
+                
+                # Sources in professional format
+                if sources:
+                    with st.expander(f"📚 {len(sources)} sources", expanded=False):
+                        for i, source in enumerate(sources, 1):
+                            st.markdown(f"**{i}. {source['source']}** • Chunk {source['chunk_id']}")
+                            with st.container():
+                                st.code(source['content'], language=None)
+                            if i < len(sources):
+                                st.markdown("---")
                 
+                # Save to history once streaming has finished
                 assistant_message = {
                     "role": "assistant",
-                    "content": error_msg,
+                    "content": answer,
+                    "sources": sources,
                     "timestamp": datetime.now().isoformat()
                 }
                 st.session_state.chat_history.append(assistant_message)
-                db.save_message(st.session_state.session_id, "assistant", error_msg)
+                assistant_message["id"] = db.save_message(
+                    st.session_state.session_id, 
+                    "assistant", 
+                    answer,
+                    sources
+                )
+        
+        except Exception as e:
+            error_msg = f"⚠️ Something went wrong. Please try again.\n\nError: {str(e)}"
+            st.error(error_msg)
+            
+            assistant_message = {
+                "role": "assistant",
+                "content": error_msg,
+                "timestamp": datetime.now().isoformat()
+            }
+            st.session_state.chat_history.append(assistant_message)
+            assistant_message["id"] = db.save_message(st.session_state.session_id, "assistant", error_msg)
 
 # Professional footer
 st.markdown("---")
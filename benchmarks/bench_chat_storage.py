@@ -0,0 +1,147 @@
+"""Benchmark: chat database size, backup time and history loads, before and after compaction.
+
+Writes a chat history in the old layout (schema v4: every assistant
+message carries its sources as a JSON blob of snippets) and measures it.
+Then it opens the file with ChatDatabase, which migrates to shared chunk
+rows and compressed long messages, and checks that every session loads
+back identical. Last it runs compact() with a retention window that
+archives the idle half of the sessions, and measures each stage.
+
+    python benchmarks/bench_chat_storage.py --sessions 200 --turns 50
+
+Exits with status 1 if any session loads back differently after migration.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_paragraphs
+from src.database import MIGRATIONS, ChatDatabase
+
+
+def write_legacy(path, rng, sessions, turns, chunk_pool):
+    """A v4 database filled the way the old save_message did."""
+    chunks = [
+        {"source": f"doc{i % 40}.pdf", "chunk_id": f"{i:08x}:{i}",
+         "content": make_paragraphs(rng, 1, 40)[0][:200] + "..."}
+        for i in range(chunk_pool)
+    ]
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    for migrate in MIGRATIONS[:4]:
+        migrate(c)
+    c.execute("PRAGMA user_version = 4")
+    now = datetime.now()
+    for s in range(sessions):
+        session_id = f"session-{s}"
+        # Half the sessions were last used long ago
+        last = now - timedelta(days=365 if s % 2 else 1)
+        for t in range(turns):
+            stamp = (last - timedelta(minutes=turns - t)).isoformat()
+            c.execute("""INSERT INTO messages (session_id, role, content, sources, timestamp)
+                         VALUES (?, 'user', ?, NULL, ?)""",
+                      (session_id, make_paragraphs(rng, 1, 15)[0], stamp))
+            answer = "\n\n".join(make_paragraphs(rng, rng.randint(1, 3), 90))
+            sources = rng.sample(chunks, 3)
+            c.execute("""INSERT INTO messages (session_id, role, content, sources, timestamp)
+                         VALUES (?, 'assistant', ?, ?, ?)""",
+                      (session_id, answer, json.dumps(sources), stamp))
+        c.execute("INSERT INTO sessions VALUES (?, ?, ?, ?)",
+                  (session_id, stamp, last.isoformat(), 2 * turns))
+    conn.commit()
+    conn.close()
+
+
+def legacy_load(conn, session_id, limit):
+    """The old load_messages: JSON sources parsed from every row."""
+    rows = conn.execute("""SELECT id, role, content, sources, timestamp FROM messages
+                           WHERE session_id = ? ORDER BY id DESC LIMIT ?""",
+                        (session_id, limit)).fetchall()
+    messages = []
+    for row in reversed(rows):
+        message = {"id": row[0], "role": row[1], "content": row[2], "timestamp": row[4]}
+        if row[3]:
+            message["sources"] = json.loads(row[3])
+        messages.append(message)
+    return messages
+
+
+def measure(path, load, session_ids, limit):
+    """File size, time to back the file up, and time to load every session's latest page."""
+    size = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    backup_path = path + ".backup"
+    start = time.perf_counter()
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(backup_path)
+    source.backup(target)
+    target.close()
+    source.close()
+    backup_seconds = time.perf_counter() - start
+    os.remove(backup_path)
+    
+    start = time.perf_counter()
+    for session_id in session_ids:
+        load(session_id, limit)
+    load_seconds = time.perf_counter() - start
+    return {
+        "megabytes": round(size / (1 << 20), 2),
+        "backup_ms": round(1000 * backup_seconds, 1),
+        "load_page_ms": round(1000 * load_seconds / len(session_ids), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=50, help="question/answer pairs per session")
+    parser.add_argument("--chunks", type=int, default=2000, help="distinct chunks cited")
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--retain-days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    session_ids = [f"session-{s}" for s in range(args.sessions)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chat_data.db")
+        write_legacy(path, rng, args.sessions, args.turns, args.chunks)
+        
+        conn = sqlite3.connect(path)
+        expected = {s: legacy_load(conn, s, 2 * args.turns) for s in session_ids}
+        report = {"legacy": measure(path, lambda s, n: legacy_load(conn, s, n), session_ids, args.page)}
+        conn.close()
+        
+        start = time.perf_counter()
+        db = ChatDatabase(path)
+        report["migration_seconds"] = round(time.perf_counter() - start, 2)
+        mismatches = sum(db.load_messages(s, 2 * args.turns) != expected[s] for s in session_ids)
+        report["migrated"] = measure(path, db.load_messages, session_ids, args.page)
+        
+        stats = db.compact(args.retain_days, os.path.join(tmp, "archive"))
+        kept = [s for s in session_ids if db.get_session(s)]
+        report["compacted"] = measure(path, db.load_messages, kept, args.page)
+        report["compaction"] = {key: stats[key] for key in ("sessions_archived", "messages_archived",
+                                                             "chunks_removed", "pages_freed")}
+        report["archive_megabytes"] = round(sum(
+            os.path.getsize(os.path.join(tmp, "archive", name))
+            for name in os.listdir(os.path.join(tmp, "archive"))
+        ) / (1 << 20), 2)
+        report["migration_mismatches"] = mismatches
+        db.close()
+    
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
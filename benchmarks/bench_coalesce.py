@@ -0,0 +1,117 @@
+"""Benchmark: upstream calls when many sessions ask the same questions at once.
+
+Simulates concurrent sessions sharing one vector store and RAG chain, as
+the app does. Each session searches and streams an answer for one of a
+few popular questions, all released at the same moment. Embeddings and
+the LLM are offline fakes with API-like latency that count their calls.
+The run is repeated with coalescing switched off for comparison.
+
+    python benchmarks/bench_coalesce.py --sessions 100 --questions 5
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_paragraphs
+from benchmarks.fakes import CountingChatModel, CountingEmbeddings
+from langchain_core.documents import Document
+from src import query_cache, rag_chain, vector_store
+from src.local_vector_store import LocalVectorStore
+from src.rag_chain import RAGChain
+
+
+class PassThrough:
+    """Stand-in for SingleFlight that never coalesces."""
+    
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+    
+    def stream(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+def run(store, chain, questions, sessions):
+    query_cache.query_embeddings.clear()
+    query_cache.answers.clear()
+    store.embeddings.query_calls = 0
+    chain.llm.calls = 0
+    start_line = threading.Barrier(sessions)
+    latencies = []
+    
+    def session(question):
+        start_line.wait()
+        start = time.perf_counter()
+        results = store.search(question, k=3)
+        "".join(chain.stream_query(question, results))
+        latencies.append(time.perf_counter() - start)
+    
+    threads = [
+        threading.Thread(target=session, args=(questions[n % len(questions)],))
+        for n in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "embed_calls": store.embeddings.query_calls,
+        "llm_calls": chain.llm.calls,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "max_session_seconds": round(max(latencies), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=5, help="distinct questions asked")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    os.environ.setdefault("HYBRID_SEARCH", "false")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(os.path.join(tmp, "index"),
+                                 embeddings=CountingEmbeddings(latency=args.embed_latency))
+        paragraphs = make_paragraphs(rng, 200)
+        store.create_index([
+            Document(page_content=text, metadata={"source": f"doc{n % 10}.txt"})
+            for n, text in enumerate(paragraphs)
+        ])
+        # About 0.2s per streamed answer
+        chain = RAGChain(llm=CountingChatModel(
+            responses=["An answer drawn from the provided context."], sleep=0.005
+        ))
+        questions = [" ".join(text.split()[:10]) for text in rng.sample(paragraphs, args.questions)]
+        
+        coalesced = run(store, chain, questions, args.sessions)
+        flights = (vector_store._query_embeddings, vector_store._searches,
+                   rag_chain._answers, rag_chain._answer_streams)
+        vector_store._query_embeddings = vector_store._searches = PassThrough()
+        rag_chain._answers = rag_chain._answer_streams = PassThrough()
+        try:
+            independent = run(store, chain, questions, args.sessions)
+        finally:
+            (vector_store._query_embeddings, vector_store._searches,
+             rag_chain._answers, rag_chain._answer_streams) = flights
+    
+    print(json.dumps({
+        "sessions": args.sessions,
+        "distinct_questions": args.questions,
+        "coalesced": coalesced,
+        "not_coalesced": independent
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmark: chat messages written per second.
+
+Compares the old connect-per-call pattern against the pooled ChatDatabase,
+single-threaded and with several concurrent writer threads.
+
+    python benchmarks/bench_database.py --messages 2000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.database import ChatDatabase
+
+
+def naive_save_message(db_path, session_id, role, content):
+    """The pre-pooling save_message: one connection per call, rollback journal."""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("""INSERT INTO messages
+                 (session_id, role, content, sources, timestamp)
+                 VALUES (?, ?, ?, ?, ?)""",
+              (session_id, role, content, None, datetime.now().isoformat()))
+    c.execute("""INSERT OR REPLACE INTO sessions
+                 (session_id, created_at, last_activity, message_count)
+                 VALUES (?,
+                         COALESCE((SELECT created_at FROM sessions WHERE session_id = ?), ?),
+                         ?,
+                         COALESCE((SELECT message_count FROM sessions WHERE session_id = ?), 0) + 1)""",
+              (session_id, session_id, datetime.now().isoformat(),
+               datetime.now().isoformat(), session_id))
+    conn.commit()
+    conn.close()
+
+
+def run_writers(write, messages, threads):
+    """Split ``messages`` writes across ``threads``; returns (rate, errors)."""
+    errors = []
+    per_thread = messages // threads
+    
+    def worker(n):
+        for i in range(per_thread):
+            try:
+                write(f"session-{n}", "user" if i % 2 else "assistant", f"message {i} " * 20)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+    
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return (per_thread * threads - len(errors)) / elapsed, len(errors)
+
+
+def bench(messages, threads):
+    results = {}
+    for label, thread_count in (("single_thread", 1), (f"{threads}_threads", threads)):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Baseline: fresh rollback-journal database, connection per call
+            naive_path = os.path.join(tmp, "naive.db")
+            ChatDatabase(naive_path).close()
+            conn = sqlite3.connect(naive_path)
+            conn.execute("PRAGMA journal_mode = DELETE")
+            conn.close()
+            rate, errors = run_writers(
+                lambda *a: naive_save_message(naive_path, *a), messages, thread_count
+            )
+            results[f"{label}_before"] = {"messages_per_second": round(rate, 1), "errors": errors}
+            
+            db = ChatDatabase(os.path.join(tmp, "pooled.db"))
+            rate, errors = run_writers(db.save_message, messages, thread_count)
+            db.close()
+            results[f"{label}_after"] = {"messages_per_second": round(rate, 1), "errors": errors}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    
+    print(json.dumps(bench(args.messages, args.threads), indent=2))
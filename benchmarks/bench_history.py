@@ -0,0 +1,99 @@
+"""Benchmark: chat history paging and app rerun cost as a session grows.
+
+Fills sessions of increasing length, then times loading a page of
+messages deep in the history with keyset pagination (``before_id``)
+against LIMIT/OFFSET, and times a full rerun of app.py (Streamlit's
+AppTest, local backend, no API calls) for each session length, drawing
+one page of history and, as before paging, the whole session.
+
+    python benchmarks/bench_history.py --lengths 50,500,5000
+
+Rerun time should stay flat as the session grows.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from src.database import ChatDatabase
+
+
+def best_ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(1000 * best, 3)
+
+
+def offset_page(db, session_id, offset, limit):
+    """LIMIT/OFFSET paging, which walks every skipped row."""
+    with db._connection() as conn:
+        return conn.execute("""SELECT id, role, content, sources, timestamp
+                               FROM messages WHERE session_id = ?
+                               ORDER BY id DESC LIMIT ? OFFSET ?""",
+                            (session_id, limit, offset)).fetchall()
+
+
+def rerun_ms(app_path, session_id, repeat, page_size):
+    from streamlit.testing.v1 import AppTest
+    
+    os.environ["HISTORY_PAGE_SIZE"] = str(page_size)
+    at = AppTest.from_file(app_path, default_timeout=120)
+    at.session_state["session_id"] = session_id
+    at.run()
+    assert not at.exception, at.exception
+    return best_ms(at.run, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", default="50,500,5000", help="session lengths in messages")
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    lengths = [int(value) for value in args.lengths.split(",")]
+    
+    os.environ.update(VECTOR_STORE_BACKEND="local", HYBRID_SEARCH="false",
+                      OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "unused"),
+                      GROQ_API_KEY=os.getenv("GROQ_API_KEY", "unused"))
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # app.py opens chat_data.db and its index relative to the working directory
+        os.chdir(tmp)
+        db = ChatDatabase("chat_data.db")
+        for length in lengths:
+            session_id = f"session-{length}"
+            ids = [
+                db.save_message(session_id, "user" if i % 2 == 0 else "assistant",
+                                f"Message {i} " + "lorem ipsum " * 40,
+                                [{"source": "doc.txt", "chunk_id": i, "content": "excerpt " * 30}]
+                                if i % 2 else None)
+                for i in range(length)
+            ]
+            # The oldest full page: the deepest a "Load earlier" click can reach
+            cursor = ids[args.page]
+            report[length] = {
+                "keyset_page_ms": best_ms(lambda: db.load_messages(session_id, args.page, before_id=cursor),
+                                          args.repeat),
+                "offset_page_ms": best_ms(lambda: offset_page(db, session_id, length - args.page, args.page),
+                                          args.repeat),
+                "app_rerun_ms": rerun_ms(os.path.join(ROOT, "app.py"), session_id, args.repeat, args.page),
+                "app_rerun_ms_whole_session": rerun_ms(os.path.join(ROOT, "app.py"), session_id,
+                                                       args.repeat, length)
+            }
+        db.close()
+        os.chdir(ROOT)
+    
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
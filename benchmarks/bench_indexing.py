@@ -0,0 +1,177 @@
+"""Check and benchmark: the indexing pipeline against flaky fake embedding and upsert services.
+
+The fake services take ``--latency`` seconds per call. A share of their calls
+fail the way the real APIs do: HTTP 429 and 503 responses, httpx transport
+errors and openai connection errors. The check verifies that:
+
+- every chunk is upserted exactly once despite the retries,
+- chunks in flight stay within what the bounded queues allow (backpressure),
+- a non-transient 4xx from either service aborts the run with that error,
+  without reading the rest of the input.
+
+It also reports throughput with and without faults.
+
+    python benchmarks/bench_indexing.py --chunks 5000 --failure-rate 0.2
+
+Exits with status 1 if any check fails.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+import httpx
+import openai
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.indexing import IndexingPipeline, is_transient_error
+
+
+class APIStatusError(Exception):
+    """An HTTP error response, carrying its status code like the SDKs' errors."""
+    
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def transient_error(rng):
+    request = httpx.Request("POST", "http://fake-service/v1")
+    return rng.choice([
+        APIStatusError(429),
+        APIStatusError(503),
+        httpx.ConnectError("connection reset", request=request),
+        openai.APIConnectionError(request=request)
+    ])
+
+
+class FakeService:
+    """Embedding and upsert endpoints that are slow and sometimes fail.
+
+    ``fatal_after`` makes the named endpoint answer HTTP 400 once that
+    many calls have succeeded.
+    """
+    
+    def __init__(self, latency, failure_rate, seed=0, fatal_endpoint=None, fatal_after=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fatal_endpoint = fatal_endpoint
+        self.fatal_after = fatal_after
+        self.rng = random.Random(seed)
+        self.upserted = Counter()
+        self.produced = 0
+        self.max_in_flight = 0
+        self.calls = Counter()
+        self.failures = 0
+        self._lock = threading.Lock()
+    
+    def _call(self, endpoint):
+        time.sleep(self.latency)
+        with self._lock:
+            if endpoint == self.fatal_endpoint and self.calls[endpoint] >= self.fatal_after:
+                raise APIStatusError(400)
+            if self.rng.random() < self.failure_rate:
+                self.failures += 1
+                raise transient_error(self.rng)
+            self.calls[endpoint] += 1
+    
+    def embed(self, texts):
+        self._call("embed")
+        return [[float(len(text)), 1.0] for text in texts]
+    
+    def upsert(self, documents, vectors):
+        self._call("upsert")
+        with self._lock:
+            self.upserted.update(doc.metadata["chunk_id"] for doc in documents)
+    
+    def documents(self, count):
+        """The input stream, recording how far parsing ran ahead of upserts."""
+        for i in range(count):
+            with self._lock:
+                self.produced += 1
+                in_flight = self.produced - sum(self.upserted.values())
+                self.max_in_flight = max(self.max_in_flight, in_flight)
+            yield Document(page_content=f"chunk {i}", metadata={"chunk_id": f"chunk-{i}"})
+
+
+def make_pipeline(service, args):
+    return IndexingPipeline(service.embed, service.upsert, batch_size=args.batch_size,
+                            embed_workers=args.workers, upsert_workers=args.workers,
+                            queue_size=args.queue_size, max_retries=8, retry_delay=0.001)
+
+
+def run(args, failure_rate):
+    service = FakeService(args.latency, failure_rate, args.seed)
+    stats = make_pipeline(service, args).run(service.documents(args.chunks))
+    # A batch in each queue slot and in each worker, plus the one being read
+    bound = args.batch_size * (2 * args.queue_size + 2 * args.workers + 2)
+    problems = []
+    if set(service.upserted) != {f"chunk-{i}" for i in range(args.chunks)}:
+        problems.append(f"{args.chunks - len(service.upserted)} chunks never upserted")
+    duplicates = sum(1 for count in service.upserted.values() if count > 1)
+    if duplicates:
+        problems.append(f"{duplicates} chunks upserted more than once")
+    if service.max_in_flight > bound:
+        problems.append(f"{service.max_in_flight} chunks in flight, queues allow {bound}")
+    return {
+        "chunks_per_second": stats["chunks_per_second"],
+        "transient_failures": service.failures,
+        "max_chunks_in_flight": service.max_in_flight,
+        "in_flight_bound": bound,
+        "problems": problems
+    }
+
+
+def run_fatal(args, endpoint):
+    """A 4xx from ``endpoint`` must stop the run and surface as the error."""
+    service = FakeService(args.latency, args.failure_rate, args.seed,
+                          fatal_endpoint=endpoint, fatal_after=3)
+    threads = threading.active_count()
+    try:
+        make_pipeline(service, args).run(service.documents(args.chunks))
+        raised = None
+    except Exception as e:
+        raised = e
+    problems = []
+    if not isinstance(raised, APIStatusError) or raised.status_code != 400:
+        problems.append(f"run ended with {raised!r}, not the HTTP 400")
+    elif is_transient_error(raised):
+        problems.append("HTTP 400 treated as transient")
+    if service.produced >= args.chunks:
+        problems.append("the whole input was read after the run failed")
+    if threading.active_count() > threads:
+        problems.append("pipeline threads still running")
+    return {"chunks_read": service.produced, "problems": problems}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2, help="embed and upsert workers each")
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds per service call")
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    report = {
+        "reliable": run(args, 0.0),
+        "flaky": run(args, args.failure_rate),
+        "fatal_embed_error": run_fatal(args, "embed"),
+        "fatal_upsert_error": run_fatal(args, "upsert")
+    }
+    print(json.dumps(report, indent=2))
+    if any(result["problems"] for result in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Check and benchmark: a flush costs the rows it writes, not the size of the index.
+
+Grows a LocalVectorStore and a QuantizedVectorStore (synthetic
+embeddings, no API calls) and, at each size, times flushing a small
+batch of new chunks and a small batch of re-embedded ones, as one more
+uploaded file would. Then deletes a batch and times that.
+
+    python benchmarks/bench_local_growth.py --sizes 10000,100000,300000 --dims 1536
+
+Exits with status 1 if flushing a batch into the largest index takes
+more than --max-ratio times as long as into the smallest.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.local_vector_store import LocalVectorStore
+from src.quantized_vector_store import QuantizedVectorStore
+
+
+def documents(ids):
+    return [Document(page_content=f"chunk {i}", metadata={"chunk_id": str(i), "file_hash": "bench"})
+            for i in ids]
+
+
+def upsert(store, rng, ids, dims):
+    ids = list(ids)
+    for start in range(0, len(ids), 5000):
+        batch = ids[start:start + 5000]
+        store.upsert_vectors(documents(batch), rng.standard_normal((len(batch), dims), dtype=np.float32))
+
+
+def timed_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return round(1000 * (time.perf_counter() - start), 2)
+
+
+def grow(store, rng, sizes, batch, dims, repeat):
+    """Best-of-``repeat`` times to flush a small append and a small rewrite at each size."""
+    results = []
+    count = 0
+    for size in sizes:
+        upsert(store, rng, range(count, size), dims)
+        store.flush()
+        count = size
+        append_ms, rewrite_ms = [], []
+        for _ in range(repeat):
+            def append():
+                upsert(store, rng, range(count, count + batch), dims)
+                store.flush()
+            
+            def rewrite():
+                # A re-uploaded file's chunks were written together
+                start = int(rng.integers(count - batch))
+                upsert(store, rng, range(start, start + batch), dims)
+                store.flush()
+            
+            append_ms.append(timed_ms(append))
+            rewrite_ms.append(timed_ms(rewrite))
+            count += batch
+        results.append({"vectors": size, "append_ms": min(append_ms), "rewrite_ms": min(rewrite_ms)})
+    results[-1]["delete_ms"] = timed_ms(lambda: store.delete([str(i) for i in range(batch)]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,300000", help="comma-separated index sizes")
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--batch", type=int, default=200, help="chunks per flush, about one uploaded file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-ratio", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    os.environ["HYBRID_SEARCH"] = "false"
+    
+    report = {}
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make_store in [("local", LocalVectorStore), ("int8", QuantizedVectorStore)]:
+            rng = np.random.default_rng(args.seed)
+            results = grow(make_store(os.path.join(tmp, name)), rng, sizes, args.batch, args.dims, args.repeat)
+            ratio = max(results[-1]["append_ms"], results[-1]["rewrite_ms"]) / \
+                max(min(results[0]["append_ms"], results[0]["rewrite_ms"]), 0.01)
+            report[name] = {"flushes": results, "largest_to_smallest": round(ratio, 1)}
+            failed |= ratio > args.max_ratio
+    print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
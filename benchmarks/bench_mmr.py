@@ -0,0 +1,105 @@
+"""Benchmark: redundant context tokens with and without MMR.
+
+Indexes a synthetic corpus into a throwaway LocalVectorStore using a
+hashing bag-of-words embedding (no API calls), then runs the same queries
+with plain and MMR search and compares how many retrieved words repeat a
+passage already in the context.
+
+    python benchmarks/bench_mmr.py --queries 200 --k 3
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fakes import HashingEmbeddings
+from src.document_loader import chunk_documents, file_content_hash
+from src.local_vector_store import LocalVectorStore
+from src.retrieval import redundant_tokens
+
+
+def make_corpus(directory, files, paragraphs, rng):
+    """Write topic files whose paragraphs share a per-topic vocabulary."""
+    common = [f"common{i}" for i in range(300)]
+    paths = []
+    for n in range(files):
+        topic = [f"topic{n}word{i}" for i in range(80)]
+        text = "\n\n".join(
+            " ".join(rng.choice(topic if rng.random() < 0.4 else common) for _ in range(400))
+            for _ in range(paragraphs)
+        )
+        path = os.path.join(directory, f"topic{n}.txt")
+        with open(path, "w") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def run(store, queries, k, mmr):
+    words = redundant = 0
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.search(query, k=k, mmr=mmr)
+        latencies.append(time.perf_counter() - start)
+        words += sum(len(doc.page_content.split()) for doc in results)
+        redundant += redundant_tokens(results)
+    return {
+        "context_words_per_query": round(words / len(queries), 1),
+        "redundant_words_per_query": round(redundant / len(queries), 1),
+        "redundant_share": round(redundant / words, 4) if words else 0.0,
+        "mean_latency_ms": round(1000 * sum(latencies) / len(latencies), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        chunks = []
+        for path in make_corpus(tmp, args.files, args.paragraphs, rng):
+            with open(path) as f:
+                document = Document(page_content=f.read(), metadata={"source": path})
+            chunks.extend(chunk_documents([document], file_hash=file_content_hash(path)))
+        
+        store = LocalVectorStore(os.path.join(tmp, "index"), embeddings=HashingEmbeddings())
+        store.create_index(chunks)
+        
+        # Queries are word windows taken from random chunks
+        queries = []
+        for _ in range(args.queries):
+            words = rng.choice(chunks).page_content.split()
+            start = rng.randrange(max(1, len(words) - 12))
+            queries.append(" ".join(words[start:start + 12]))
+        
+        plain = run(store, queries, args.k, mmr=False)
+        diverse = run(store, queries, args.k, mmr=True)
+    
+    saved = plain["redundant_words_per_query"] - diverse["redundant_words_per_query"]
+    print(json.dumps({
+        "chunks": len(chunks),
+        "queries": args.queries,
+        "k": args.k,
+        "plain": plain,
+        "mmr": diverse,
+        "redundant_words_saved_per_query": round(saved, 1)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
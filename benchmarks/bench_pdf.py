@@ -0,0 +1,76 @@
+"""Benchmark: PDF page extraction with PyPDFLoader against iter_pdf_pages.
+
+Writes a synthetic manual where some pages are image-only scans, then
+extracts it with LangChain's PyPDFLoader, with iter_pdf_pages in this
+process, and with iter_pdf_pages across worker processes. Page texts
+and page numbers must match PyPDFLoader's.
+
+    python benchmarks/bench_pdf.py --pages 500 --scanned-every 10 --workers 4
+
+Exits with status 1 if any page differs.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_paragraphs, write_pdf
+from src.pdf_pages import iter_pdf_pages
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500, help="approximate number of text pages")
+    parser.add_argument("--scanned-every", type=int, default=10,
+                        help="make every n-th page an image-only scan (0 for none)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    from langchain_community.document_loaders import PyPDFLoader
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "manual.pdf")
+        # About four 120-word paragraphs fill a 50-line page
+        paragraphs = make_paragraphs(random.Random(args.seed), 4 * args.pages)
+        write_pdf(path, paragraphs, scanned_every=args.scanned_every)
+        
+        loader_seconds, reference = timed(lambda: PyPDFLoader(path).load())
+        serial_seconds, serial = timed(lambda: list(iter_pdf_pages(path, max_workers=1)))
+        parallel_seconds, parallel = timed(lambda: list(iter_pdf_pages(path, max_workers=args.workers)))
+    
+    expected = [(doc.metadata["page"], doc.page_content) for doc in reference]
+    mismatches = sum(
+        [(doc.metadata["page"], doc.page_content) for doc in pages] != expected
+        for pages in (serial, parallel)
+    )
+    print(json.dumps({
+        "pages": len(reference),
+        "scanned_pages": sum(not doc.page_content for doc in reference),
+        "workers": args.workers,
+        "cpus": os.cpu_count(),
+        "pypdfloader_seconds": round(loader_seconds, 3),
+        "direct_serial_seconds": round(serial_seconds, 3),
+        "direct_parallel_seconds": round(parallel_seconds, 3),
+        "speedup_serial": round(loader_seconds / serial_seconds, 2),
+        "speedup_parallel": round(loader_seconds / parallel_seconds, 2),
+        "mismatched_runs": mismatches
+    }, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark: recall@k and memory of the quantized store against exact search.
+
+Indexes synthetic clustered embeddings (no API calls) into a
+QuantizedVectorStore for each quantization, then compares its results
+for noisy copies of stored vectors with an exact float32 scan of the
+same index. Recall is reported with and without exact rescoring.
+
+    python benchmarks/bench_quantized.py --vectors 50000 --dims 1536 --k 10
+
+Exits with status 1 if rescored recall@k falls below --min-recall.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_embeddings
+from src.local_vector_store import LocalVectorStore, normalize, top_k
+from src.quantized_vector_store import QUANTIZATIONS, QuantizedVectorStore
+
+
+def build(index_dir, vectors, quantization):
+    store = QuantizedVectorStore(index_dir, quantization=quantization)
+    for start in range(0, len(vectors), 5000):
+        batch = range(start, min(start + 5000, len(vectors)))
+        documents = [
+            Document(page_content=f"chunk {i}", metadata={"chunk_id": str(i), "file_hash": "bench"})
+            for i in batch
+        ]
+        store.upsert_vectors(documents, vectors[batch.start:batch.stop])
+    store.flush()
+    return store
+
+
+def recall(expected, found):
+    return sum(len(set(e) & set(f)) for e, f in zip(expected, found)) / sum(len(e) for e in expected)
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(query) for query in queries]
+    return 1000 * (time.perf_counter() - start) / len(queries), results
+
+
+def ids(documents):
+    return [int(doc.metadata["chunk_id"]) for doc in documents]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-recall", type=float, default=0.98)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    
+    vectors = make_embeddings(rng, args.vectors, args.dims, args.clusters)
+    picks = rng.integers(args.vectors, size=args.queries)
+    queries = normalize(vectors[picks] + 0.05 * rng.standard_normal((args.queries, args.dims), dtype=np.float32))
+    float32_bytes = vectors.nbytes
+    
+    report = {"vectors": args.vectors, "dims": args.dims, "k": args.k,
+              "float32_megabytes": round(float32_bytes / (1 << 20), 1)}
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantization in QUANTIZATIONS:
+            store = build(os.path.join(tmp, quantization), vectors, quantization)
+            exact_ms, exact = timed(lambda q: ids(LocalVectorStore.search_by_vector(store, q, args.k)), queries)
+            quantized_ms, found = timed(lambda q: ids(store.search_by_vector(q, args.k)), queries)
+            # Codes only, no rescoring: what the quantization alone gets right
+            unrescored = [top_k(store.approximate_scores(q), args.k).tolist() for q in queries]
+            
+            rescored_recall = recall(exact, found)
+            failed |= rescored_recall < args.min_recall
+            report[quantization] = {
+                "megabytes": round(store.memory_bytes() / (1 << 20), 1),
+                "memory_reduction": round(float32_bytes / store.memory_bytes(), 2),
+                f"recall@{args.k}": round(rescored_recall, 4),
+                f"recall@{args.k}_without_rescoring": round(recall(exact, unrescored), 4),
+                "exact_ms_per_query": round(exact_ms, 2),
+                "quantized_ms_per_query": round(quantized_ms, 2)
+            }
+            del store
+    
+    print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
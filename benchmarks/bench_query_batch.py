@@ -0,0 +1,102 @@
+"""Benchmark: answering an evaluation set one by one versus with query_batch.
+
+Indexes a synthetic corpus into a throwaway LocalVectorStore, then
+answers the same questions with the sequential search + query loop and
+with RAGChain.query_batch. Embeddings and the LLM are offline fakes with
+API-like latency per call, so the comparison reflects round trips rather
+than compute. Both runs must return the same answers and sources.
+
+    python benchmarks/bench_query_batch.py --questions 300 --llm-latency 0.1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_paragraphs
+from benchmarks.fakes import CountingChatModel, CountingEmbeddings
+from langchain_core.documents import Document
+from src import query_cache
+from src.local_vector_store import LocalVectorStore
+from src.rag_chain import RAGChain
+
+
+def reset(store, chain):
+    query_cache.query_embeddings.clear()
+    query_cache.answers.clear()
+    store.embeddings.query_calls = store.embeddings.document_calls = 0
+    chain.llm.calls = 0
+
+
+def calls(store, chain):
+    return {
+        "embedding_requests": store.embeddings.query_calls + store.embeddings.document_calls,
+        "llm_calls": chain.llm.calls
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    os.environ.setdefault("HYBRID_SEARCH", "false")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(os.path.join(tmp, "index"),
+                                 embeddings=CountingEmbeddings(latency=args.embed_latency))
+        paragraphs = make_paragraphs(rng, 500)
+        store.create_index([
+            Document(page_content=text, metadata={"source": f"doc{n % 20}.txt"})
+            for n, text in enumerate(paragraphs)
+        ])
+        chain = RAGChain(llm=CountingChatModel(
+            responses=["An answer drawn from the provided context."], latency=args.llm_latency
+        ))
+        questions = [
+            " ".join(rng.choice(paragraphs).split()[:rng.randint(6, 14)])
+            for _ in range(args.questions)
+        ]
+        
+        reset(store, chain)
+        start = time.perf_counter()
+        sequential = [chain.query(question, store.search(question, k=args.k)) for question in questions]
+        sequential_seconds = time.perf_counter() - start
+        sequential_calls = calls(store, chain)
+        
+        reset(store, chain)
+        start = time.perf_counter()
+        batched = chain.query_batch(store, questions, k=args.k, max_concurrency=args.concurrency)
+        batched_seconds = time.perf_counter() - start
+        batched_calls = calls(store, chain)
+    
+    same = [(r["answer"], r["sources"]) for r in sequential] == [(r["answer"], r["sources"]) for r in batched]
+    print(json.dumps({
+        "questions": args.questions,
+        "same_results": same,
+        "errors": sum("error" in r for r in batched),
+        "sequential": dict(sequential_calls, seconds=round(sequential_seconds, 2)),
+        "query_batch": dict(batched_calls, seconds=round(batched_seconds, 2)),
+        "speedup": round(sequential_seconds / batched_seconds, 1),
+        "projected_5000_questions_minutes": {
+            "sequential": round(sequential_seconds / args.questions * 5000 / 60, 1),
+            "query_batch": round(batched_seconds / args.questions * 5000 / 60, 1)
+        }
+    }, indent=2))
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Startup-time budget: how long before the app can render its first page.
+
+Each sample runs in a fresh interpreter, like a new Streamlit server
+process. It measures importing the modules app.py needs, then building a
+session's vector store, RAG chain and chat database. The heavy SDKs are
+loaded separately by the warm-up hook off the render path; that time is
+reported as well but does not count against the budget.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 800
+
+Exits with status 1 when the median startup exceeds the budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = r"""
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+
+start = time.perf_counter()
+from src.document_loader import iter_chunks, load_and_chunk_many, file_content_hash
+from src.ingest import index_file
+from src.vector_store import get_vector_store
+from src.rag_chain import RAGChain
+from src.database import ChatDatabase
+from src import tracing, warmup
+imported = time.perf_counter()
+
+db = ChatDatabase(os.path.join(sys.argv[1], "chat.db"))
+store = get_vector_store()
+chain = RAGChain()
+db.load_messages("startup-probe")
+constructed = time.perf_counter()
+
+warmup.warm_up()
+warmed = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": 1000 * (imported - start),
+    "construct_ms": 1000 * (constructed - imported),
+    "warmup_ms": 1000 * (warmed - constructed)
+}))
+"""
+
+
+def sample(tmp):
+    env = dict(os.environ)
+    # Placeholder keys: nothing here may contact the APIs
+    env.setdefault("OPENAI_API_KEY", "sk-startup-probe")
+    env.setdefault("GROQ_API_KEY", "gsk-startup-probe")
+    env.setdefault("PINECONE_API_KEY", "startup-probe")
+    env["LEXICAL_INDEX_PATH"] = os.path.join(tmp, "lexical.db")
+    env["EMBEDDING_CACHE_PATH"] = os.path.join(tmp, "embeddings.db")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, tmp],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0,
+                        help="maximum median import + construction time")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            samples.append(sample(tmp))
+
+    result = {
+        key: round(statistics.median(s[key] for s in samples), 1)
+        for key in ("import_ms", "construct_ms", "warmup_ms")
+    }
+    result["startup_ms"] = round(result["import_ms"] + result["construct_ms"], 1)
+    result["budget_ms"] = args.budget_ms
+    result["within_budget"] = result["startup_ms"] <= args.budget_ms
+    print(json.dumps(result, indent=2))
+    if not result["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
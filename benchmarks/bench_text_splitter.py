@@ -0,0 +1,127 @@
+"""Benchmark: built-in TextSplitter against LangChain's RecursiveCharacterTextSplitter.
+
+First checks that both produce identical chunks, on synthetic documents
+and on randomized short texts across many chunk sizes, overlaps and
+separator lists, and that every chunk equals the text slice given by
+its offsets. Then times both on a multi-megabyte text.
+
+    python benchmarks/bench_text_splitter.py --megabytes 4 --cases 2000
+
+Exits with status 1 if any case differs.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_paragraphs
+from src.text_splitter import TextSplitter
+
+SEPARATOR_LISTS = (
+    ["\n\n", "\n", " ", ""],
+    ["\n\n", "\n", " "],
+    ["\n", " "],
+    ["\n\n", ".", " ", ""],
+    [" "],
+)
+
+# Fragments that exercise separator runs, long words and non-ASCII text
+FRAGMENTS = ["a", "bb", "ccc", " ", "  ", "\n", "\n\n", "\n\n\n", "\t", ". ", "x" * 50, "word ", "é"]
+
+
+def make_document(rng, megabytes):
+    """Paragraph text with some paragraphs broken into lines, about ``megabytes`` long."""
+    paragraphs = []
+    size = 0
+    while size < megabytes * (1 << 20):
+        paragraph = make_paragraphs(rng, 1, words_per_paragraph=rng.randint(40, 400))[0]
+        if rng.random() < 0.3:
+            paragraph = paragraph.replace(". ", ".\n")
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def same_chunks(text, chunk_size, chunk_overlap, separators):
+    reference = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=separators
+    ).split_text(text)
+    spans = TextSplitter(chunk_size, chunk_overlap, separators).split_spans(text)
+    return [text[start:end] for start, end in spans] == reference
+
+
+def check_equivalence(rng, cases):
+    failures = []
+    document = make_document(rng, 0.25)
+    for chunk_size, chunk_overlap in ((1000, 200), (500, 0), (256, 64), (2000, 400)):
+        for separators in SEPARATOR_LISTS:
+            if not same_chunks(document, chunk_size, chunk_overlap, separators):
+                failures.append({"chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+                                 "separators": separators})
+    
+    for _ in range(cases):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 400)))
+        chunk_size = rng.randint(1, 80)
+        chunk_overlap = rng.randint(0, chunk_size)
+        separators = rng.choice(SEPARATOR_LISTS)
+        if not same_chunks(text, chunk_size, chunk_overlap, separators):
+            failures.append({"text": text, "chunk_size": chunk_size,
+                             "chunk_overlap": chunk_overlap, "separators": separators})
+    return failures
+
+
+def best_seconds(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=4.0)
+    parser.add_argument("--cases", type=int, default=2000, help="randomized equivalence cases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    
+    failures = check_equivalence(rng, args.cases)
+    
+    text = make_document(rng, args.megabytes)
+    langchain = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200, length_function=len,
+        separators=["\n\n", "\n", " ", ""]
+    )
+    builtin = TextSplitter(1000, 200, ["\n\n", "\n", " ", ""])
+    langchain_seconds = best_seconds(lambda: langchain.split_text(text), args.repeat)
+    builtin_seconds = best_seconds(lambda: builtin.split_text(text), args.repeat)
+    
+    print(json.dumps({
+        "equivalence_cases": args.cases + 4 * len(SEPARATOR_LISTS),
+        "mismatches": len(failures),
+        "first_mismatch": failures[0] if failures else None,
+        "text_megabytes": round(len(text) / (1 << 20), 2),
+        "chunks": len(builtin.split_spans(text)),
+        "langchain_seconds": round(langchain_seconds, 4),
+        "builtin_seconds": round(builtin_seconds, 4),
+        "speedup": round(langchain_seconds / builtin_seconds, 2)
+    }, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Synthetic TXT, PDF and DOCX documents, and embeddings, for benchmarks.
+
+The PDF and DOCX writers produce the smallest files that pypdf and
+docx2txt accept, so no extra packages are needed to build a corpus.
+"""
+
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+VOCABULARY = (
+    "model data vector index query token latency throughput cache chunk "
+    "embedding retrieval context answer source document page section system "
+    "network storage memory request response server client batch stream "
+    "error code value result metric budget score rank search text file"
+).split()
+
+
+def make_paragraphs(rng, count, words_per_paragraph=120):
+    """Paragraphs of sentence-like text with some rare identifiers mixed in."""
+    paragraphs = []
+    for _ in range(count):
+        words = []
+        while len(words) < words_per_paragraph:
+            sentence = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 18))]
+            if rng.random() < 0.1:
+                sentence.append(f"ERR-{rng.randint(100, 999)}")
+            sentence[0] = sentence[0].capitalize()
+            words.extend(sentence)
+            words[-1] += "."
+        paragraphs.append(" ".join(words))
+    return paragraphs
+
+
+def make_embeddings(rng, count, dims, clusters, latent_dims=None):
+    """Unit vectors around random topic centres, like embeddings of a mixed corpus.
+
+    With ``latent_dims``, points are drawn in that many dimensions and
+    projected up with a little noise: real embeddings have low intrinsic
+    dimension, which is what ANN indexes exploit. ``rng`` is a NumPy Generator.
+    """
+    latent = latent_dims or dims
+    centres = rng.standard_normal((clusters, latent), dtype=np.float32)
+    projection = rng.standard_normal((latent, dims), dtype=np.float32) if latent_dims else None
+    topics = rng.integers(clusters, size=count)
+    vectors = np.empty((count, dims), dtype=np.float32)
+    for start in range(0, count, 10000):
+        stop = min(start + 10000, count)
+        if projection is None:
+            block = centres[topics[start:stop]] + 1.5 * rng.standard_normal((stop - start, dims), dtype=np.float32)
+        else:
+            points = 2 * centres[topics[start:stop]] + rng.standard_normal((stop - start, latent), dtype=np.float32)
+            noise = 0.1 * np.sqrt(latent) * rng.standard_normal((stop - start, dims), dtype=np.float32)
+            block = points @ projection + noise
+        vectors[start:stop] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def write_txt(path, paragraphs):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+
+def _wrap(text, width=90):
+    line, lines = [], []
+    for word in text.split():
+        if line and len(" ".join(line + [word])) > width:
+            lines.append(" ".join(line))
+            line = []
+        line.append(word)
+    if line:
+        lines.append(" ".join(line))
+    return lines
+
+
+def _scanned_page_stream(rng, side=256):
+    """Content stream drawing one inline grayscale image and no text, like a scan."""
+    # Bytes above 0x7f can't be mistaken for the EI operator or whitespace
+    pixels = bytes(rng.randrange(0x80, 0x100) for _ in range(side * side))
+    return (b"q 572 0 0 802 20 20 cm BI /W %d /H %d /CS /G /BPC 8 ID " % (side, side)
+            + pixels + b" EI Q")
+
+
+def write_pdf(path, paragraphs, lines_per_page=50, scanned_every=0):
+    """Write a PDF 1.4 file using the built-in Helvetica font.
+
+    With ``scanned_every=n``, every n-th page is an image without any text
+    layer instead.
+    """
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(_wrap(paragraph))
+        lines.append("")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    if scanned_every:
+        for n in range(scanned_every - 1, len(pages), scanned_every):
+            pages.insert(n, None)
+    rng = random.Random(len(pages))
+    
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content per page
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for n, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * n, 5 + 2 * n
+        kids.append(f"{page_id} 0 R")
+        if page_lines is None:
+            stream = _scanned_page_stream(rng)
+            objects[content_id] = (b"<< /Length %d >>\nstream\n" % len(stream)
+                                   + stream + b"\nendstream")
+            objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                                f"/Resources << >> /Contents {content_id} 0 R >>").encode("latin-1")
+            continue
+        shown = " ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*"
+            for line in page_lines
+        )
+        stream = f"BT /F1 10 Tf 14 TL 40 800 Td {shown} ET".encode("latin-1")
+        objects[content_id] = (b"<< /Length %d >>\nstream\n" % len(stream)
+                               + stream + b"\nendstream")
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> "
+                            f"/Contents {content_id} 0 R >>").encode("latin-1")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("latin-1")
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def write_docx(path, paragraphs):
+    """Write a minimal WordprocessingML package with one run per paragraph."""
+    body = "".join(f"<w:p><w:r><w:t>{escape(p)}</w:t></w:r></w:p>" for p in paragraphs)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        z.writestr("_rels/.rels", _RELS)
+        z.writestr("word/document.xml", document)
+
+
+WRITERS = {"txt": write_txt, "pdf": write_pdf, "docx": write_docx}
+
+
+def make_corpus(directory, paragraph_counts, formats=("txt", "pdf", "docx"), seed=0):
+    """Write one file per format and size; returns {(format, paragraphs): path}."""
+    rng = random.Random(seed)
+    files = {}
+    for count in paragraph_counts:
+        paragraphs = make_paragraphs(rng, count)
+        for fmt in formats:
+            path = os.path.join(directory, f"corpus_{count}.{fmt}")
+            WRITERS[fmt](path, paragraphs)
+            files[(fmt, count)] = path
+    return files
@@ -0,0 +1,94 @@
+"""Offline stand-ins for the OpenAI embeddings and the Groq LLM."""
+
+import asyncio
+import hashlib
+import threading
+import time
+from typing import ClassVar
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature hashing of words: deterministic, and similar texts get similar vectors."""
+    
+    model_name = "hashing-bow"
+    
+    def __init__(self, size=256):
+        self.size = size
+    
+    def _embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector.tolist()
+    
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    """HashingEmbeddings that count their calls and take ``latency`` seconds each, like an API."""
+    
+    def __init__(self, size=256, latency=0.05):
+        super().__init__(size)
+        self.latency = latency
+        self.query_calls = 0
+        self.document_calls = 0
+        self._lock = threading.Lock()
+    
+    def embed_query(self, text):
+        with self._lock:
+            self.query_calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+    
+    def embed_documents(self, texts):
+        with self._lock:
+            self.document_calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+class CountingChatModel(FakeListChatModel):
+    """Stub chat model that counts invocations.
+
+    ``latency`` is how long an invoke takes (awaited when called async);
+    ``sleep`` paces streaming per character.
+    """
+    
+    calls: int = 0
+    latency: float = 0.0
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+    
+    def _call(self, *args, **kwargs):
+        self._count()
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+    
+    async def _agenerate(self, *args, **kwargs):
+        self._count()
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.responses[0]))])
+    
+    def _stream(self, *args, **kwargs):
+        self._count()
+        yield from super()._stream(*args, **kwargs)
+
+
+def stub_llm(answer="This is a benchmark answer drawn from the provided context."):
+    """Chat model that always replies with ``answer``, streamed word by word."""
+    return FakeListChatModel(responses=[answer])
@@ -0,0 +1,269 @@
+"""Offline benchmark suite for the whole RAG pipeline.
+
+Uses hashing embeddings and a stub chat model, so no API keys or network
+are needed. Measures document loading and chunking on synthetic TXT, PDF
+and DOCX corpora of increasing size, indexing throughput, search latency,
+context formatting, end-to-end answering and every ChatDatabase operation:
+chat history (including keyset paging), documents and their chunk IDs, the
+ingestion job queue and compaction.
+
+Record a baseline once, then compare later runs against it:
+
+    python benchmarks/run_suite.py --output baseline.json
+    python benchmarks/run_suite.py --baseline baseline.json --threshold 0.25
+
+With ``--baseline`` the exit status is 1 when any metric is worse than the
+baseline by more than the threshold (a fraction, 0.25 = 25%).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import make_corpus
+from benchmarks.fakes import HashingEmbeddings, stub_llm
+from src import query_cache
+from src.database import ChatDatabase
+from src.document_loader import chunk_documents, file_content_hash, load_document
+from src.local_vector_store import LocalVectorStore
+from src.rag_chain import RAGChain
+
+
+class Recorder:
+    """Collects metrics as {name: {value, unit, better, gate}}.
+
+    Metrics with ``gate`` false are reported but never fail a comparison.
+    """
+    
+    def __init__(self):
+        self.metrics = {}
+    
+    def add(self, name, value, unit, better, gate=True):
+        self.metrics[name] = {"value": round(value, 4), "unit": unit, "better": better, "gate": gate}
+        print(f"  {name:<48} {value:>12.3f} {unit}")
+    
+    def latencies(self, name, samples):
+        """Record p50/p95/p99 of samples given in seconds."""
+        ordered = sorted(samples)
+        for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            index = min(len(ordered) - 1, int(q * len(ordered)))
+            # A couple of scheduler hiccups decide p99, so it is informational
+            self.add(f"{name}.{label}_ms", 1000 * ordered[index], "ms", "lower", gate=label != "p99")
+
+
+def time_calls(fn, args_list):
+    """Call ``fn(*args)`` for each args tuple; returns per-call seconds."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def best_seconds(fn, repeat):
+    """Fastest of ``repeat`` runs (the least disturbed by other load) and the result."""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), result
+
+
+def bench_loading(rec, files, repeat):
+    for (fmt, size), path in sorted(files.items()):
+        seconds, documents = best_seconds(lambda: load_document(path), repeat)
+        chars = sum(len(doc.page_content) for doc in documents)
+        rec.add(f"load.{fmt}.{size}.mb_per_second", chars / seconds / 1e6, "MB/s", "higher")
+        
+        seconds, chunks = best_seconds(lambda: chunk_documents(documents), repeat)
+        rec.add(f"chunk.{fmt}.{size}.chunks_per_second", len(chunks) / seconds, "chunks/s", "higher")
+
+
+def bench_indexing(rec, store, chunks):
+    store.create_index(chunks)
+    stats = store.last_index_stats
+    rec.add("index.chunks_per_second", stats["chunks_per_second"], "chunks/s", "higher")
+    rec.add("index.embed_chunks_per_second", stats["embed"]["chunks_per_second"], "chunks/s", "higher")
+    rec.add("index.upsert_chunks_per_second", stats["upsert"]["chunks_per_second"], "chunks/s", "higher")
+
+
+def bench_search(rec, store, queries, k):
+    lexical_index = store.lexical_index
+    modes = (
+        ("dense", {"mmr": False}, None),
+        ("hybrid", {"mmr": False}, lexical_index),
+        ("hybrid_mmr", {"mmr": True}, lexical_index),
+    )
+    for label, options, index in modes:
+        store.lexical_index = index
+        query_cache.query_embeddings.clear()
+        samples = time_calls(lambda q: store.search(q, k=k, **options), [(q,) for q in queries])
+        rec.latencies(f"search.{label}", samples)
+    store.lexical_index = lexical_index
+
+
+def bench_rag(rec, store, queries, k):
+    chain = RAGChain(llm=stub_llm())
+    retrieved = [store.search(q, k=max(k, 10)) for q in queries[:50]]
+    
+    for limit in sorted({k, 10}):
+        documents = [docs[:limit] for docs in retrieved]
+        seconds, _ = best_seconds(lambda: time_calls(chain.format_context, [(d,) for d in documents]), 10)
+        rec.add(f"format_context.k{limit}.mean_us", 1e6 * seconds / len(documents), "us", "lower")
+    
+    pairs = [(q, docs[:k]) for q, docs in zip(queries, retrieved)]
+    query_cache.answers.clear()
+    rec.latencies("rag.query", time_calls(chain.query, pairs))
+    query_cache.answers.clear()
+    rec.latencies("rag.stream_query", time_calls(lambda q, d: list(chain.stream_query(q, d)), pairs))
+
+
+def bench_database(rec, directory, messages):
+    db = ChatDatabase(os.path.join(directory, "bench_chat.db"))
+    sessions = [f"session-{n}" for n in range(50)]
+    sources = [{"source": "doc.txt", "chunk_id": "abc-1", "content": "x" * 200}]
+    
+    def per_op(name, fn, args_list):
+        samples = time_calls(fn, args_list)
+        rec.add(f"db.{name}.mean_us", 1e6 * statistics.mean(samples), "us", "lower")
+    
+    per_op("save_message", db.save_message, [
+        (sessions[i % len(sessions)], "assistant" if i % 2 else "user", f"message {i} " * 30,
+         sources if i % 2 else None)
+        for i in range(messages)
+    ])
+    per_op("load_messages", db.load_messages, [(s,) for s in sessions] * 4)
+    # Keyset paging: the page before each session's newest 10 messages
+    newest = {s: db.load_messages(s, 10) for s in sessions}
+    pages = [(s, 10, page[0]["id"]) for s, page in newest.items() if page]
+    per_op("load_messages_page", db.load_messages, pages * 4)
+    per_op("get_session", db.get_session, [(s,) for s in sessions] * 4)
+    per_op("get_all_sessions", db.get_all_sessions, [()] * 100)
+    per_op("get_most_recent_session", db.get_most_recent_session, [()] * 200)
+    per_op("save_document", db.save_document, [
+        (f"file{i % 40}.pdf", 1000 + i, 10 + i, f"{i:064x}") for i in range(200)
+    ])
+    per_op("get_document", db.get_document, [(f"file{i % 40}.pdf",) for i in range(200)])
+    per_op("get_document_stats", db.get_document_stats, [()] * 200)
+    chunks = {f"{i:016x}-0": i for i in range(200)}
+    per_op("save_document_chunks", db.save_document, [
+        (f"file{i % 40}.pdf", 1000 + i, len(chunks), f"{i:064x}", chunks) for i in range(40)
+    ])
+    per_op("get_document_chunks", db.get_document_chunks, [(f"file{i % 40}.pdf",) for i in range(200)])
+    
+    files = [{"filename": f"file{i}.pdf", "file_path": f"uploads/file{i}.pdf",
+              "file_size": 1000, "file_hash": f"{i:064x}"} for i in range(5)]
+    per_op("create_job", db.create_job, [(s, files) for s in sessions])
+    per_op("claim_next_job", db.claim_next_job, [()] * len(sessions))
+    job_ids = [job["id"] for s in sessions for job in db.get_jobs(s, 1)]
+    per_op("get_job_files", db.get_job_files, [(job_id,) for job_id in job_ids])
+    file_ids = [f["id"] for job_id in job_ids for f in db.get_job_files(job_id)]
+    per_op("update_job_file", db.update_job_file, [(file_id, "done", 10) for file_id in file_ids])
+    per_op("finish_job", db.finish_job, [(job_id,) for job_id in job_ids])
+    per_op("get_jobs", db.get_jobs, [(s,) for s in sessions] * 4)
+    per_op("requeue_interrupted_jobs", db.requeue_interrupted_jobs, [()] * 50)
+    
+    per_op("clear_session", db.clear_session, [(s,) for s in sessions])
+    # Nothing idle to archive: measures the orphaned-chunk sweep and vacuum
+    per_op("compact", db.compact, [(None, None)] * 10)
+    db.close()
+
+
+def compare(current, baseline, threshold):
+    """Print per-metric changes; returns the names of regressed metrics."""
+    regressions = []
+    print(f"\n{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metric in sorted(current["metrics"].items()):
+        base = baseline["metrics"].get(name)
+        if not base or not base["value"]:
+            continue
+        change = (metric["value"] - base["value"]) / base["value"]
+        worse = -change if metric["better"] == "higher" else change
+        flag = ""
+        if worse > threshold and metric.get("gate", True):
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<48} {base['value']:>12.3f} {metric['value']:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000",
+                        help="comma-separated corpus sizes in paragraphs (~120 words each)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    rng = random.Random(args.seed)
+    rec = Recorder()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Loading and chunking")
+        files = make_corpus(tmp, sizes, seed=args.seed)
+        bench_loading(rec, files, args.repeat)
+        
+        print("Indexing")
+        path = files[("txt", max(sizes))]
+        chunks = chunk_documents(load_document(path), file_hash=file_content_hash(path))
+        store = LocalVectorStore(os.path.join(tmp, "index"), embeddings=HashingEmbeddings())
+        bench_indexing(rec, store, chunks)
+        
+        # Queries are word windows from random chunks, so each has a true answer
+        queries = []
+        for _ in range(args.queries):
+            words = rng.choice(chunks).page_content.split()
+            start = rng.randrange(max(1, len(words) - 10))
+            queries.append(" ".join(words[start:start + 10]))
+        
+        print("Search")
+        bench_search(rec, store, queries, args.k)
+        print("RAG chain")
+        bench_rag(rec, store, queries, args.k)
+        print("Chat database")
+        bench_database(rec, tmp, args.messages)
+    
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args)
+        },
+        "metrics": rec.metrics
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Wrote {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index over unit vectors."""
+
+from typing import Iterable, Optional, Sequence
+import math
+import os
+
+import numpy as np
+
+# A trained index is retrained once the corpus grows past this multiple of
+# what it was trained on, so cells don't get too crowded
+RETRAIN_GROWTH = 4
+
+# Training points sampled per cell, and rows scored per block when assigning
+TRAINING_POINTS_PER_LIST = 32
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def default_lists(count: int) -> int:
+    """About sqrt(n) cells, which keeps cell sizes and cell count balanced."""
+    return max(1, int(math.sqrt(count)))
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k < len(scores):
+        return np.argpartition(-scores, k - 1)[:k]
+    return np.arange(len(scores))
+
+
+class IVFIndex:
+    """Spherical k-means cells with an inverted list of row numbers per cell.
+
+    The index holds only centroids and cell assignments; vectors stay with
+    the caller (e.g. a memory-mapped matrix) and are read for the rows in
+    the ``nprobe`` cells closest to the query. New rows are assigned to an
+    existing cell without retraining.
+    """
+    
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, trained_on: int):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        self.trained_on = trained_on
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+    
+    @classmethod
+    def train(cls, vectors: np.ndarray, n_lists: Optional[int] = None,
+              iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        """Cluster a sample of ``vectors`` with k-means, then assign all of them."""
+        count = len(vectors)
+        n_lists = min(n_lists or default_lists(count), count)
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, n_lists * TRAINING_POINTS_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))],
+                            dtype=np.float32)
+        
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)]
+        for _ in range(iterations):
+            labels = cls._nearest(centroids, sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            sizes = np.bincount(labels, minlength=n_lists)
+            # Cells that lost all their points restart from a random point
+            empty = np.flatnonzero(sizes == 0)
+            sums[empty] = sample[rng.choice(sample_size, len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+        
+        index = cls(centroids, np.empty(0, dtype=np.int32), trained_on=count)
+        index.add(vectors)
+        return index
+    
+    @staticmethod
+    def _nearest(centroids: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+    
+    def __len__(self) -> int:
+        return len(self.assignments)
+    
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+    
+    def add(self, vectors: np.ndarray):
+        """Append rows ``len(self)`` onwards, each to its nearest cell."""
+        if len(vectors):
+            self.assignments = np.concatenate([self.assignments, self._nearest(self.centroids, vectors)])
+            self._order = None
+    
+    def reassign(self, rows: Sequence[int], vectors: np.ndarray):
+        """Move rows whose vectors were replaced to their new nearest cells."""
+        if len(rows):
+            self.assignments[np.asarray(rows)] = self._nearest(self.centroids, vectors)
+            self._order = None
+    
+    def select(self, rows: Iterable[int]) -> "IVFIndex":
+        """Index over only ``rows``, renumbered in order (after a delete)."""
+        rows = np.fromiter(rows, dtype=np.int64)
+        return IVFIndex(self.centroids, self.assignments[rows], self.trained_on)
+    
+    def needs_training(self, count: int) -> bool:
+        """Whether a corpus of ``count`` rows has outgrown the trained cells."""
+        return count > RETRAIN_GROWTH * self.trained_on
+    
+    def candidates(self, query_vector: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows in the ``nprobe`` cells nearest the query, in ascending order."""
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable")
+            self._offsets = np.concatenate(
+                [[0], np.cumsum(np.bincount(self.assignments, minlength=self.n_lists))]
+            )
+        cells = _top(self.centroids @ query_vector, nprobe)
+        rows = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in cells])
+        rows.sort()
+        return rows
+    
+    def save(self, path: str):
+        """Write the index atomically."""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, assignments=self.assignments,
+                     trained_on=np.int64(self.trained_on))
+        os.replace(tmp, path)
+    
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["assignments"], int(data["trained_on"]))
@@ -0,0 +1,127 @@
+"""Coalesce identical concurrent calls into one upstream call ("single flight")."""
+
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+import threading
+
+
+class _Call:
+    """One in-flight call whose result every waiter shares."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Broadcast:
+    """One in-flight stream; each subscriber replays it from the first item."""
+    
+    def __init__(self):
+        self.items: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = threading.Condition()
+    
+    def produce(self, source: Callable[[], Iterator]):
+        try:
+            for item in source():
+                with self.changed:
+                    self.items.append(item)
+                    self.changed.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self.changed:
+                self.finished = True
+                self.changed.notify_all()
+    
+    def subscribe(self) -> Iterator:
+        position = 0
+        while True:
+            with self.changed:
+                while position == len(self.items) and not self.finished:
+                    self.changed.wait()
+                finished = self.finished
+                batch = self.items[position:]
+            position += len(batch)
+            yield from batch
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Callers that arrive while a call with the same key is running wait for
+    it and share its result (or exception) instead of making their own.
+    Nothing is kept once the call finishes; caching is left to the caller.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+    
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Return ``fn(*args, **kwargs)``, sharing a running call with the same key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stream(self, key: Hashable, fn: Callable[..., Iterator], *args, **kwargs) -> Iterator:
+        """Iterate ``fn(*args, **kwargs)``, sharing a running stream with the same key.
+
+        The stream is produced on its own thread, so it runs to completion
+        even if the caller that started it stops reading.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = self._streams[key] = _Broadcast()
+                self.calls += 1
+                threading.Thread(
+                    target=self._produce, args=(key, broadcast, fn, args, kwargs),
+                    daemon=True, name=f"{self.name}-stream"
+                ).start()
+            else:
+                self.coalesced += 1
+        return broadcast.subscribe()
+    
+    def _produce(self, key, broadcast: _Broadcast, fn, args, kwargs):
+        try:
+            broadcast.produce(lambda: fn(*args, **kwargs))
+        finally:
+            with self._lock:
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+    
+    def stats(self) -> Dict[str, int]:
+        """Upstream calls made and calls that joined one already running."""
+        return {"calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,154 @@
+"""Pack retrieved chunks into a prompt context under a token budget."""
+
+from typing import List, NamedTuple, Optional
+from langchain_core.documents import Document
+import threading
+
+# Shortest shared text treated as chunk overlap rather than coincidence
+MIN_OVERLAP = 20
+
+# Don't bother adding a truncated passage smaller than this
+MIN_PASSAGE_TOKENS = 32
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken's cl100k encoding, or False when it can't be loaded."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    # Not installed, or the BPE file can't be downloaded
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text``: exact with tiktoken, else ~4 characters per token."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to at most ``max_tokens``, preferably at a sentence or line end."""
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        cut = encoding.decode(tokens[:max_tokens])
+    else:
+        if len(text) <= max_tokens * 4:
+            return text
+        cut = text[:max_tokens * 4]
+    
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary >= len(cut) // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " …"
+
+
+def overlap_length(left: str, right: str) -> int:
+    """Length of the longest suffix of ``left`` that is also a prefix of ``right``."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class Passage:
+    """A run of adjacent chunks from one source, with their overlap removed."""
+    
+    def __init__(self, doc: Document, rank: int):
+        self.source = doc.metadata.get('source', 'Unknown')
+        self.chunk_ids = [doc.metadata.get('chunk_id', 'N/A')]
+        self.last_index = doc.metadata.get('chunk_index')
+        self.rank = rank
+        self.text = doc.page_content
+    
+    def follows(self, doc: Document) -> bool:
+        index = doc.metadata.get('chunk_index')
+        return (self.last_index is not None and index == self.last_index + 1
+                and doc.metadata.get('source', 'Unknown') == self.source)
+    
+    def extend(self, doc: Document, rank: int):
+        overlap = overlap_length(self.text, doc.page_content)
+        separator = "" if overlap else "\n"
+        self.text += separator + doc.page_content[overlap:]
+        self.chunk_ids.append(doc.metadata.get('chunk_id', 'N/A'))
+        self.last_index = doc.metadata.get('chunk_index')
+        self.rank = min(self.rank, rank)
+    
+    def header(self, number: int) -> str:
+        label = "Chunk" if len(self.chunk_ids) == 1 else "Chunks"
+        return f"[Source {number}: {self.source}, {label} {', '.join(map(str, self.chunk_ids))}]"
+
+
+class PackedContext(NamedTuple):
+    """Prompt context plus what went into it."""
+    text: str
+    tokens: int
+    chunks_used: int
+    truncated: bool
+
+
+def merge_adjacent(documents: List[Document]) -> List[Passage]:
+    """Merge neighbouring chunks of the same source into passages.
+
+    Passages are ordered by their best-ranked chunk, so retrieval order
+    (best score first) is kept.
+    """
+    ranked = sorted(
+        enumerate(documents),
+        key=lambda item: (item[1].metadata.get('source', 'Unknown'),
+                          item[1].metadata.get('chunk_index', -1), item[0])
+    )
+    passages: List[Passage] = []
+    for rank, doc in ranked:
+        if passages and passages[-1].follows(doc):
+            passages[-1].extend(doc, rank)
+        else:
+            passages.append(Passage(doc, rank))
+    passages.sort(key=lambda passage: passage.rank)
+    return passages
+
+
+def pack_context(documents: List[Document], max_tokens: Optional[int] = None) -> PackedContext:
+    """Format retrieved chunks as context, using at most ``max_tokens`` tokens.
+
+    Adjacent chunks are merged first so their overlap is sent once. Passages
+    are added best first; the one that crosses the budget is cut at a
+    sentence boundary, and the rest are dropped.
+    """
+    parts = []
+    used = 0
+    chunks_used = 0
+    truncated = False
+    
+    for passage in merge_adjacent(documents):
+        header = passage.header(len(parts) + 1)
+        part = f"{header}\n{passage.text}\n"
+        cost = count_tokens(part) + (1 if parts else 0)
+        if max_tokens is not None and used + cost > max_tokens:
+            truncated = True
+            # Leave room for the separator, ellipsis and a split token
+            remaining = max_tokens - used - count_tokens(header) - 4
+            if remaining >= MIN_PASSAGE_TOKENS:
+                part = f"{header}\n{truncate_to_tokens(passage.text, remaining)}\n"
+                parts.append(part)
+                used += count_tokens(part) + (1 if len(parts) > 1 else 0)
+                chunks_used += len(passage.chunk_ids)
+            break
+        parts.append(part)
+        used += cost
+        chunks_used += len(passage.chunk_ids)
+    
+    return PackedContext("\n".join(parts), used, chunks_used, truncated)
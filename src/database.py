@@ -1,149 +1,436 @@
 """Database module for chat history and document tracking."""
 
 import sqlite3
+import gzip
+import hashlib
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import os
+import queue
+import re
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List, Dict, Optional, Tuple
+
+try:
+    from .tracing import traced
+except ImportError:
+    from tracing import traced
+
+# Message text at least this long is stored zlib-compressed
+COMPRESS_MIN_BYTES = 1024
+
+
+def _pack_content(content: str):
+    """Message text as stored: a zlib BLOB when long enough to be worth it."""
+    data = content.encode("utf-8")
+    if len(data) < COMPRESS_MIN_BYTES:
+        return content
+    packed = zlib.compress(data)
+    return packed if len(packed) < len(data) else content
+
+
+def _unpack_content(content) -> str:
+    # Short and incompressible messages stay TEXT; BLOBs are compressed
+    if isinstance(content, bytes):
+        return zlib.decompress(content).decode("utf-8")
+    return content
+
+
+def _save_sources(c: sqlite3.Cursor, message_id: int, sources: List[Dict]):
+    """Store a message's citations as references to shared chunk rows."""
+    for position, source in enumerate(sources):
+        chunk = (source.get("source", "Unknown"), source.get("chunk_id", "N/A"), source.get("content", ""))
+        digest = hashlib.sha1(json.dumps(chunk).encode("utf-8")).digest()
+        c.execute("""INSERT INTO chunks (digest, source, chunk_id, content)
+                     VALUES (?, ?, ?, ?)
+                     ON CONFLICT (digest) DO NOTHING""", (digest, *chunk))
+        chunk_ref = c.execute("SELECT id FROM chunks WHERE digest = ?", (digest,)).fetchone()[0]
+        c.execute("""INSERT INTO message_sources (message_id, position, chunk_ref)
+                     VALUES (?, ?, ?)""", (message_id, position, chunk_ref))
+
+
+def _migrate_base_tables(c: sqlite3.Cursor):
+    """v1: the original schema."""
+    # Chat messages table
+    c.execute('''CREATE TABLE IF NOT EXISTS messages
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  session_id TEXT NOT NULL,
+                  role TEXT NOT NULL,
+                  content TEXT NOT NULL,
+                  sources TEXT,
+                  timestamp TEXT NOT NULL)''')
+    
+    # Documents table
+    c.execute('''CREATE TABLE IF NOT EXISTS documents
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  filename TEXT NOT NULL,
+                  file_size INTEGER,
+                  chunk_count INTEGER,
+                  upload_timestamp TEXT NOT NULL,
+                  status TEXT DEFAULT 'active')''')
+    
+    # Sessions table
+    c.execute('''CREATE TABLE IF NOT EXISTS sessions
+                 (session_id TEXT PRIMARY KEY,
+                  created_at TEXT NOT NULL,
+                  last_activity TEXT NOT NULL,
+                  message_count INTEGER DEFAULT 0)''')
+
+
+def _migrate_file_hash(c: sqlite3.Cursor):
+    """v2: content hash of each indexed file."""
+    # Unversioned databases may already have the column
+    columns = [row[1] for row in c.execute("PRAGMA table_info(documents)")]
+    if 'file_hash' not in columns:
+        c.execute("ALTER TABLE documents ADD COLUMN file_hash TEXT")
+
+
+def _migrate_indexes(c: sqlite3.Cursor):
+    """v3: secondary indexes and an exact message counter."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions (last_activity)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents (filename, status)")
+    
+    # From here on save_message/clear_session keep the counter in step
+    c.execute("""UPDATE sessions SET message_count =
+                 (SELECT COUNT(*) FROM messages WHERE messages.session_id = sessions.session_id)""")
+
+
+def _migrate_jobs(c: sqlite3.Cursor):
+    """v4: background ingestion jobs and their files."""
+    c.execute('''CREATE TABLE IF NOT EXISTS jobs
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  session_id TEXT NOT NULL,
+                  status TEXT NOT NULL DEFAULT 'queued',
+                  created_at TEXT NOT NULL,
+                  updated_at TEXT NOT NULL,
+                  error TEXT)''')
+    
+    c.execute('''CREATE TABLE IF NOT EXISTS job_files
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  job_id INTEGER NOT NULL REFERENCES jobs (id),
+                  filename TEXT NOT NULL,
+                  file_path TEXT NOT NULL,
+                  file_size INTEGER,
+                  file_hash TEXT,
+                  status TEXT NOT NULL DEFAULT 'pending',
+                  chunk_count INTEGER DEFAULT 0,
+                  error TEXT,
+                  updated_at TEXT)''')
+    
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs (session_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_job_files_job ON job_files (job_id, id)")
+
+
+def _migrate_compact_history(c: sqlite3.Cursor):
+    """v5: cited chunks stored once, and long message text compressed."""
+    # chunk_id has no declared type so integer and string IDs round-trip as they were
+    c.execute('''CREATE TABLE IF NOT EXISTS chunks
+                 (id INTEGER PRIMARY KEY,
+                  digest BLOB NOT NULL UNIQUE,
+                  source TEXT NOT NULL,
+                  chunk_id NOT NULL,
+                  content TEXT NOT NULL)''')
+    
+    c.execute('''CREATE TABLE IF NOT EXISTS message_sources
+                 (message_id INTEGER NOT NULL REFERENCES messages (id),
+                  position INTEGER NOT NULL,
+                  chunk_ref INTEGER NOT NULL REFERENCES chunks (id),
+                  PRIMARY KEY (message_id, position)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_message_sources_chunk ON message_sources (chunk_ref)")
+    
+    # Move existing JSON sources into the new tables, a batch at a time
+    last_id = 0
+    while True:
+        rows = c.execute("""SELECT id, content, sources FROM messages
+                            WHERE id > ? AND (sources IS NOT NULL OR length(content) >= ?)
+                            ORDER BY id LIMIT 1000""", (last_id, COMPRESS_MIN_BYTES)).fetchall()
+        if not rows:
+            break
+        for message_id, content, sources in rows:
+            if sources:
+                _save_sources(c, message_id, json.loads(sources))
+            c.execute("UPDATE messages SET content = ?, sources = NULL WHERE id = ?",
+                      (_pack_content(content), message_id))
+        last_id = rows[-1][0]
+
+
+def _migrate_document_chunks(c: sqlite3.Cursor):
+    """v6: the chunk IDs of each active document, to diff against its next version."""
+    c.execute('''CREATE TABLE IF NOT EXISTS document_chunks
+                 (filename TEXT NOT NULL,
+                  chunk_id TEXT NOT NULL,
+                  chunk_index INTEGER NOT NULL,
+                  PRIMARY KEY (filename, chunk_id)) WITHOUT ROWID''')
+
+
+# Applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = [
+    _migrate_base_tables,
+    _migrate_file_hash,
+    _migrate_indexes,
+    _migrate_jobs,
+    _migrate_compact_history,
+    _migrate_document_chunks,
+]
+
 
 class ChatDatabase:
-    """SQLite database for chat history and document tracking."""
+    """SQLite database for chat history and document tracking.
+
+    Connections are pooled and shared across threads, so Streamlit's
+    per-rerun script threads reuse open connections (and their cached
+    prepared statements) instead of reconnecting on every call.
+    """
     
-    def __init__(self, db_path: str = "chat_data.db"):
+    def __init__(self, db_path: str = "chat_data.db", busy_timeout: float = 10.0,
+                 pool_size: int = 8):
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=pool_size)
         self.init_db()
     
+    def _open(self) -> sqlite3.Connection:
+        """Open a tuned connection."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        # WAL makes NORMAL durable enough: commits survive app crashes
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -16000")
+        return conn
+    
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection; commits on success, rolls back on error."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    def close(self):
+        """Close all pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
     def init_db(self):
-        """Initialize database tables."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Chat messages table
-        c.execute('''CREATE TABLE IF NOT EXISTS messages
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      session_id TEXT NOT NULL,
-                      role TEXT NOT NULL,
-                      content TEXT NOT NULL,
-                      sources TEXT,
-                      timestamp TEXT NOT NULL)''')
-        
-        # Documents table
-        c.execute('''CREATE TABLE IF NOT EXISTS documents
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      filename TEXT NOT NULL,
-                      file_size INTEGER,
-                      chunk_count INTEGER,
-                      upload_timestamp TEXT NOT NULL,
-                      status TEXT DEFAULT 'active')''')
-        
-        # Sessions table
-        c.execute('''CREATE TABLE IF NOT EXISTS sessions
-                     (session_id TEXT PRIMARY KEY,
-                      created_at TEXT NOT NULL,
-                      last_activity TEXT NOT NULL,
-                      message_count INTEGER DEFAULT 0)''')
-        
-        conn.commit()
-        conn.close()
-    
-    def save_message(self, session_id: str, role: str, content: str, 
-                    sources: Optional[List[Dict]] = None):
-        """Save a chat message."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("""INSERT INTO messages 
-                     (session_id, role, content, sources, timestamp) 
-                     VALUES (?, ?, ?, ?, ?)""",
-                  (session_id, role, content, 
-                   json.dumps(sources) if sources else None,
-                   datetime.now().isoformat()))
-        
-        # Update session
-        c.execute("""INSERT OR REPLACE INTO sessions 
-                     (session_id, created_at, last_activity, message_count)
-                     VALUES (?, 
-                             COALESCE((SELECT created_at FROM sessions WHERE session_id = ?), ?),
-                             ?,
-                             COALESCE((SELECT message_count FROM sessions WHERE session_id = ?), 0) + 1)""",
-                  (session_id, session_id, datetime.now().isoformat(), 
-                   datetime.now().isoformat(), session_id))
-        
-        conn.commit()
-        conn.close()
-    
-    def load_messages(self, session_id: str, limit: int = 100) -> List[Dict]:
-        """Load chat messages for a session."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("""SELECT role, content, sources, timestamp 
-                     FROM messages 
-                     WHERE session_id = ? 
-                     ORDER BY id DESC LIMIT ?""", (session_id, limit))
+        """Initialize database tables, applying any pending schema migrations."""
+        with self._connection() as conn:
+            # Lets compact() hand freed pages back; applies as the first table is created
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # Readers no longer block writers (persistent per database file)
+            conn.execute("PRAGMA journal_mode = WAL")
+            
+            # One writer migrates; concurrent processes wait, then see the new version
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for migrate in MIGRATIONS[version:]:
+                migrate(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        
+        with self._connection() as conn:
+            # Databases created before auto_vacuum was set need one full VACUUM to switch
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                try:
+                    conn.execute("VACUUM")
+                    # VACUUM rewrote the whole file into the WAL; fold it back in
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+                    print("✓ Enabled incremental vacuum for chat database")
+                except sqlite3.OperationalError as e:
+                    print(f"⚠ Could not vacuum chat database, will retry on next start: {e}")
+    
+    @traced("db.save_message")
+    def save_message(self, session_id: str, role: str, content: str,
+                    sources: Optional[List[Dict]] = None) -> int:
+        """Save a chat message and return its ID."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""INSERT INTO messages
+                         (session_id, role, content, timestamp)
+                         VALUES (?, ?, ?, ?)""",
+                      (session_id, role, _pack_content(content), datetime.now().isoformat()))
+            message_id = c.lastrowid
+            if sources:
+                _save_sources(c, message_id, sources)
+            
+            # Update session and its maintained message counter
+            now = datetime.now().isoformat()
+            c.execute("""INSERT INTO sessions
+                         (session_id, created_at, last_activity, message_count)
+                         VALUES (?, ?, ?, 1)
+                         ON CONFLICT (session_id) DO UPDATE SET
+                             last_activity = excluded.last_activity,
+                             message_count = message_count + 1""",
+                      (session_id, now, now))
+        return message_id
+    
+    @traced("db.load_messages")
+    def load_messages(self, session_id: str, limit: int = 100,
+                      before_id: Optional[int] = None) -> List[Dict]:
+        """Load up to ``limit`` of a session's latest messages, oldest first.
+
+        Pass the ``id`` of the oldest message already loaded as ``before_id``
+        to fetch the page before it; the (session_id, id) index makes every
+        page cost the same however long the session is.
+        """
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            if before_id is None:
+                c.execute("""SELECT id, role, content, timestamp
+                             FROM messages
+                             WHERE session_id = ?
+                             ORDER BY id DESC LIMIT ?""", (session_id, limit))
+            else:
+                c.execute("""SELECT id, role, content, timestamp
+                             FROM messages
+                             WHERE session_id = ? AND id < ?
+                             ORDER BY id DESC LIMIT ?""", (session_id, before_id, limit))
+            rows = c.fetchall()
+            
+            sources: Dict[int, List[Dict]] = {}
+            if rows:
+                # The page's citations, walking the same (session_id, id) range
+                c.execute("""SELECT ms.message_id, ch.source, ch.chunk_id, ch.content
+                             FROM messages m
+                             JOIN message_sources ms ON ms.message_id = m.id
+                             JOIN chunks ch ON ch.id = ms.chunk_ref
+                             WHERE m.session_id = ? AND m.id BETWEEN ? AND ?
+                             ORDER BY ms.message_id, ms.position""",
+                          (session_id, rows[-1][0], rows[0][0]))
+                for message_id, source, chunk_id, content in c.fetchall():
+                    sources.setdefault(message_id, []).append(
+                        {"source": source, "chunk_id": chunk_id, "content": content}
+                    )
         
         messages = []
-        for row in reversed(c.fetchall()):
+        for row in reversed(rows):
             msg = {
-                "role": row[0],
-                "content": row[1],
+                "id": row[0],
+                "role": row[1],
+                "content": _unpack_content(row[2]),
                 "timestamp": row[3]
             }
-            if row[2]:
-                msg["sources"] = json.loads(row[2])
+            if row[0] in sources:
+                msg["sources"] = sources[row[0]]
             messages.append(msg)
         
-        conn.close()
         return messages
     
-    def save_document(self, filename: str, file_size: int, chunk_count: int):
-        """Save document metadata."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("""INSERT INTO documents 
-                     (filename, file_size, chunk_count, upload_timestamp) 
-                     VALUES (?, ?, ?, ?)""",
-                  (filename, file_size, chunk_count, datetime.now().isoformat()))
+    @traced("db.save_document")
+    def save_document(self, filename: str, file_size: int, chunk_count: int,
+                      file_hash: Optional[str] = None, chunks: Optional[Dict[str, int]] = None):
+        """Save document metadata, replacing any earlier version of the file.
+
+        ``chunks`` maps the new version's chunk IDs to their positions.
+        """
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""UPDATE documents SET status = 'replaced'
+                         WHERE filename = ? AND status = 'active'""", (filename,))
+            c.execute("""INSERT INTO documents
+                         (filename, file_size, chunk_count, upload_timestamp, file_hash)
+                         VALUES (?, ?, ?, ?, ?)""",
+                      (filename, file_size, chunk_count, datetime.now().isoformat(), file_hash))
+            c.execute("DELETE FROM document_chunks WHERE filename = ?", (filename,))
+            if chunks:
+                c.executemany("""INSERT INTO document_chunks (filename, chunk_id, chunk_index)
+                                 VALUES (?, ?, ?)""",
+                              ((filename, chunk_id, index) for chunk_id, index in chunks.items()))
+    
+    @traced("db.get_document")
+    def get_document(self, filename: str) -> Optional[Dict]:
+        """Get the active version of a document, if any."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""SELECT filename, file_size, chunk_count, upload_timestamp, file_hash
+                         FROM documents
+                         WHERE filename = ? AND status = 'active'
+                         ORDER BY id DESC LIMIT 1""", (filename,))
+            
+            row = c.fetchone()
         
-        conn.commit()
-        conn.close()
+        if not row:
+            return None
+        return {
+            "filename": row[0],
+            "file_size": row[1],
+            "chunk_count": row[2],
+            "upload_timestamp": row[3],
+            "file_hash": row[4]
+        }
+    
+    @traced("db.get_document_chunks")
+    def get_document_chunks(self, filename: str) -> Dict[str, int]:
+        """Chunk IDs of a document's active version, with their positions."""
+        with self._connection() as conn:
+            rows = conn.execute("""SELECT chunk_id, chunk_index FROM document_chunks
+                                   WHERE filename = ?""", (filename,)).fetchall()
+        return dict(rows)
     
+    @traced("db.get_document_stats")
     def get_document_stats(self) -> Dict:
         """Get document statistics."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("SELECT COUNT(*), SUM(chunk_count) FROM documents WHERE status='active'")
+            result = c.fetchone()
         
-        c.execute("SELECT COUNT(*), SUM(chunk_count) FROM documents WHERE status='active'")
-        result = c.fetchone()
-        
-        conn.close()
         return {
             "total_documents": result[0] or 0,
             "total_chunks": result[1] or 0
         }
     
+    @traced("db.clear_session")
     def clear_session(self, session_id: str):
         """Clear messages for a session."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            self._delete_session(c, session_id)
+    
+    @staticmethod
+    def _delete_session(c: sqlite3.Cursor, session_id: str):
+        c.execute("""DELETE FROM message_sources WHERE message_id IN
+                     (SELECT id FROM messages WHERE session_id = ?)""", (session_id,))
         c.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
         c.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-        
-        conn.commit()
-        conn.close()
     
+    @traced("db.get_all_sessions")
     def get_all_sessions(self) -> List[Dict]:
         """Get all chat sessions."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("""SELECT session_id, created_at, last_activity, message_count 
-                     FROM sessions 
-                     ORDER BY last_activity DESC""")
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""SELECT session_id, created_at, last_activity, message_count
+                         FROM sessions
+                         ORDER BY last_activity DESC""")
+            rows = c.fetchall()
         
         sessions = []
-        for row in c.fetchall():
+        for row in rows:
             sessions.append({
                 "session_id": row[0],
                 "created_at": row[1],
@@ -151,18 +438,239 @@ class ChatDatabase:
                 "message_count": row[3]
             })
         
-        conn.close()
         return sessions
     
+    @traced("db.get_session")
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """Get a session's metadata, including its message count."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""SELECT session_id, created_at, last_activity, message_count
+                         FROM sessions
+                         WHERE session_id = ?""", (session_id,))
+            row = c.fetchone()
+        
+        if not row:
+            return None
+        return {
+            "session_id": row[0],
+            "created_at": row[1],
+            "last_activity": row[2],
+            "message_count": row[3]
+        }
+    
+    @traced("db.get_most_recent_session")
     def get_most_recent_session(self) -> Optional[str]:
         """Get the most recently active session ID."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""SELECT session_id FROM sessions
+                         ORDER BY last_activity DESC LIMIT 1""")
+            
+            result = c.fetchone()
+        
+        return result[0] if result else None
+    
+    def _file_bytes(self) -> int:
+        return sum(os.path.getsize(path) for path in (self.db_path, self.db_path + "-wal")
+                   if os.path.exists(path))
+    
+    def _archive_session(self, session: Dict, archive_dir: str) -> Tuple[str, int]:
+        """Write a session and all its messages to ``archive_dir`` as gzipped JSON Lines.
+
+        Returns the archive path and the number of messages written.
+        """
+        messages: List[Dict] = []
+        before_id = None
+        while True:
+            page = self.load_messages(session["session_id"], limit=1000, before_id=before_id)
+            if not page:
+                break
+            messages[:0] = page
+            before_id = page[0]["id"]
+        
+        os.makedirs(archive_dir, exist_ok=True)
+        # Timestamped, as a session that is used again can be archived again later
+        name = re.sub(r"[^\w.-]", "_", session["session_id"])
+        path = os.path.join(archive_dir, f"{name}.{datetime.now():%Y%m%d%H%M%S}.jsonl.gz")
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            f.write(json.dumps(session) + "\n")
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+        os.replace(path + ".tmp", path)
+        return path, len(messages)
+    
+    @traced("db.compact")
+    def compact(self, retain_days: Optional[int], archive_dir: Optional[str] = "chat_archive") -> Dict:
+        """Archive and delete sessions idle for more than ``retain_days``, then reclaim space.
+
+        Each session is written to ``archive_dir`` (gzipped JSON Lines: the
+        session, then its messages) before it is deleted; with
+        ``archive_dir=None`` it is just deleted. Chunks no longer cited by
+        any message are dropped, and the freed pages are returned to the
+        file system with an incremental vacuum; ``retain_days=None`` does
+        only that. Returns what was done.
+        """
+        bytes_before = self._file_bytes()
+        idle = []
+        if retain_days is not None:
+            cutoff = (datetime.now() - timedelta(days=retain_days)).isoformat()
+            idle = [session for session in self.get_all_sessions() if session["last_activity"] < cutoff]
+        
+        archived = messages = 0
+        for session in idle:
+            path, count = self._archive_session(session, archive_dir) if archive_dir else (None, 0)
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                # A message that arrived after archiving keeps the session alive
+                still_idle = conn.execute("""SELECT 1 FROM sessions
+                                             WHERE session_id = ? AND last_activity < ?""",
+                                          (session["session_id"], cutoff)).fetchone()
+                if still_idle:
+                    self._delete_session(conn.cursor(), session["session_id"])
+                    archived += 1
+                    messages += count
+            if path and not still_idle:
+                os.remove(path)
         
-        c.execute("""SELECT session_id FROM sessions 
-                     ORDER BY last_activity DESC LIMIT 1""")
+        with self._connection() as conn:
+            chunks = conn.execute("""DELETE FROM chunks WHERE NOT EXISTS
+                                     (SELECT 1 FROM message_sources WHERE chunk_ref = chunks.id)""").rowcount
         
-        result = c.fetchone()
-        conn.close()
+        with self._connection() as conn:
+            freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # executescript steps the pragma to completion; execute frees one page per call
+            conn.executescript("PRAGMA incremental_vacuum;")
+            # Move the vacuumed pages into the main file and truncate the WAL
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        
+        return {
+            "sessions_archived": archived,
+            "messages_archived": messages,
+            "chunks_removed": chunks,
+            "pages_freed": freed,
+            "bytes_before": bytes_before,
+            "bytes_after": self._file_bytes()
+        }
+    
+    @traced("db.create_job")
+    def create_job(self, session_id: str, files: List[Dict]) -> int:
+        """Queue an ingestion job.
+
+        Each file is a dict with ``filename``, ``file_path``, ``file_size``
+        and ``file_hash``. Returns the job ID.
+        """
+        now = datetime.now().isoformat()
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""INSERT INTO jobs (session_id, status, created_at, updated_at)
+                         VALUES (?, 'queued', ?, ?)""", (session_id, now, now))
+            job_id = c.lastrowid
+            c.executemany("""INSERT INTO job_files
+                             (job_id, filename, file_path, file_size, file_hash, updated_at)
+                             VALUES (?, ?, ?, ?, ?, ?)""",
+                          [(job_id, f["filename"], f["file_path"], f["file_size"],
+                            f["file_hash"], now) for f in files])
+        return job_id
+    
+    @traced("db.claim_next_job")
+    def claim_next_job(self) -> Optional[int]:
+        """Mark the oldest queued job as running and return its ID."""
+        with self._connection() as conn:
+            # Take the write lock first so two workers can't claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("""SELECT id FROM jobs WHERE status = 'queued'
+                                  ORDER BY id LIMIT 1""").fetchone()
+            if row:
+                conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                             (datetime.now().isoformat(), row[0]))
         
-        return result[0] if result else None
\ No newline at end of file
+        return row[0] if row else None
+    
+    def requeue_interrupted_jobs(self) -> int:
+        """Put jobs left running by a stopped worker back in the queue.
+
+        Completed files keep their status, so the job resumes with the
+        first file that hadn't finished. Returns the number of jobs requeued.
+        """
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("UPDATE job_files SET status = 'pending' WHERE status = 'indexing'")
+            c.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            return c.rowcount
+    
+    @traced("db.update_job_file")
+    def update_job_file(self, file_id: int, status: str, chunk_count: Optional[int] = None,
+                        error: Optional[str] = None):
+        """Record a file's progress within its job."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""UPDATE job_files
+                         SET status = ?, chunk_count = COALESCE(?, chunk_count),
+                             error = ?, updated_at = ?
+                         WHERE id = ?""",
+                      (status, chunk_count, error, datetime.now().isoformat(), file_id))
+    
+    def finish_job(self, job_id: int, status: str = "done", error: Optional[str] = None):
+        """Mark a job as finished ("done" or "failed")."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                      (status, error, datetime.now().isoformat(), job_id))
+    
+    @traced("db.get_job_files")
+    def get_job_files(self, job_id: int) -> List[Dict]:
+        """Get the files of a job in submission order."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""SELECT id, filename, file_path, file_size, file_hash,
+                                status, chunk_count, error
+                         FROM job_files
+                         WHERE job_id = ?
+                         ORDER BY id""", (job_id,))
+            rows = c.fetchall()
+        
+        return [
+            {
+                "id": row[0],
+                "filename": row[1],
+                "file_path": row[2],
+                "file_size": row[3],
+                "file_hash": row[4],
+                "status": row[5],
+                "chunk_count": row[6],
+                "error": row[7]
+            }
+            for row in rows
+        ]
+    
+    @traced("db.get_jobs")
+    def get_jobs(self, session_id: str, limit: int = 5) -> List[Dict]:
+        """Get a session's most recent ingestion jobs, newest first, with their files."""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("""SELECT id, status, created_at, updated_at, error
+                         FROM jobs
+                         WHERE session_id = ?
+                         ORDER BY id DESC LIMIT ?""", (session_id, limit))
+            rows = c.fetchall()
+        
+        return [
+            {
+                "id": row[0],
+                "status": row[1],
+                "created_at": row[2],
+                "updated_at": row[3],
+                "error": row[4],
+                "files": self.get_job_files(row[0])
+            }
+            for row in rows
+        ]
\ No newline at end of file
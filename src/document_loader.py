@@ -1,58 +1,283 @@
 """Load and chunk documents for RAG."""
 
-from typing import List
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import (
-    TextLoader,
-    PyPDFLoader,
-    Docx2txtLoader
-)
-from langchain.schema import Document
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from concurrent.futures import as_completed
+from langchain_core.documents import Document
+import hashlib
 import os
+import time
 
+try:
+    from .tracing import enabled as tracing_enabled, observe, traced
+    from .text_splitter import TextSplitter
+    from .pdf_pages import iter_pdf_pages, process_pool
+except ImportError:
+    from tracing import enabled as tracing_enabled, observe, traced
+    from text_splitter import TextSplitter
+    from pdf_pages import iter_pdf_pages, process_pool
 
-def load_document(file_path: str) -> List[Document]:
-    """Load a document based on file type."""
+
+# Characters read per step when streaming plain-text files
+TEXT_BLOCK_SIZE = 1 << 20
+
+
+def _get_loader(file_path: str):
+    """Pick a LangChain loader based on file type (PDFs go through ``iter_pdf_pages``)."""
+    # Imported on first use; the loaders pull in their parsing libraries
+    from langchain_community.document_loaders import (
+        TextLoader,
+        Docx2txtLoader
+    )
+    
     _, ext = os.path.splitext(file_path)
     
     if ext == '.txt':
-        loader = TextLoader(file_path)
-    elif ext == '.pdf':
-        loader = PyPDFLoader(file_path)
+        return TextLoader(file_path)
     elif ext == '.docx':
-        loader = Docx2txtLoader(file_path)
+        return Docx2txtLoader(file_path)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
-    
-    return loader.load()
 
 
-def chunk_documents(
-    documents: List[Document],
-    chunk_size: int = 1000,
-    chunk_overlap: int = 200
-) -> List[Document]:
-    """Split documents into chunks."""
-    text_splitter = RecursiveCharacterTextSplitter(
+@traced("load_document")
+def load_document(file_path: str) -> List[Document]:
+    """Load a document based on file type."""
+    return list(_iter_pages(file_path))
+
+
+def _iter_pages(file_path: str, pdf_workers: Optional[int] = None) -> Iterator[Document]:
+    """Yield a document's pages (a single page for TXT and DOCX)."""
+    if os.path.splitext(file_path)[1] == '.pdf':
+        return iter_pdf_pages(file_path, max_workers=pdf_workers)
+    return _get_loader(file_path).lazy_load()
+
+
+def file_content_hash(file_path: str) -> str:
+    """Compute the SHA-256 hash of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_key(filename: str, text: str) -> str:
+    """Hash of a chunk's text within a file, the stable part of its chunk ID.
+
+    Chunk IDs are ``{chunk_key}-{occurrence}``, the occurrence telling
+    apart identical chunks within one file. A chunk keeps its ID when
+    other parts of the file change, so a new version of a file only adds
+    and removes the chunks that differ.
+    """
+    return hashlib.sha256(f"{filename}\0{text}".encode("utf-8")).hexdigest()[:16]
+
+
+def _make_splitter(chunk_size: int, chunk_overlap: int) -> TextSplitter:
+    return TextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        length_function=len,
         separators=["\n\n", "\n", " ", ""]
     )
-    
+
+
+def _tag_chunks(chunks: Iterable[Document], file_hash: Optional[str],
+                filename: Optional[str] = None) -> Iterator[Document]:
+    """Add chunk metadata, numbering the chunks of one file in order."""
+    occurrences: Dict[str, int] = {}
+    for position, chunk in enumerate(chunks):
+        chunk.metadata['chunk_index'] = position
+        if file_hash:
+            name = filename if filename is not None else os.path.basename(chunk.metadata.get('source', ''))
+            key = chunk_key(name, chunk.page_content)
+            occurrence = occurrences[key] = occurrences.get(key, -1) + 1
+            chunk.metadata['file_hash'] = file_hash
+            chunk.metadata['chunk_id'] = f"{key}-{occurrence}"
+        else:
+            chunk.metadata['chunk_id'] = position
+        yield chunk
+
+
+@traced("chunk_documents")
+def chunk_documents(
+    documents: List[Document],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    file_hash: Optional[str] = None
+) -> List[Document]:
+    """Split documents into chunks.
+
+    When ``file_hash`` is given, chunk IDs are derived from the file's
+    name and each chunk's text, so unchanged chunks keep their IDs. Each
+    chunk records its ``start_offset``/``end_offset`` within the page it
+    came from.
+    """
+    text_splitter = _make_splitter(chunk_size, chunk_overlap)
     chunks = text_splitter.split_documents(documents)
+    return list(_tag_chunks(chunks, file_hash))
+
+
+def _resume_offset(text: str, start: int) -> int:
+    """Find where the paragraph group holding the chunk at ``start`` begins in ``text``.
+
+    The splitter keeps separators at the start of each piece, so re-splitting
+    from the preceding paragraph break reproduces the same chunk boundaries.
+    Returns -1 when the chunk does not start on a paragraph break.
+    """
+    run_start = start
+    while run_start > 0 and text[run_start - 1].isspace():
+        run_start -= 1
+    return text.find("\n\n", run_start, start)
+
+
+def _iter_text_chunks(file_path: str, splitter: TextSplitter) -> Iterator[Document]:
+    """Stream a text file block by block, yielding finished chunks.
+
+    Each block is cut at its last paragraph break. The final chunk of a
+    block may still grow with the next block's text, so it is carried over
+    and re-split instead of being yielded early. Offsets are counted in
+    characters from the start of the file.
+    """
+    def make_chunk(text, start, end, base):
+        metadata = {'source': file_path, 'start_offset': base + start, 'end_offset': base + end}
+        return Document(page_content=text[start:end], metadata=metadata)
     
-    # Add chunk metadata
-    for i, chunk in enumerate(chunks):
-        chunk.metadata['chunk_id'] = i
-        
-    return chunks
+    carry = ""
+    carry_offset = 0
+    with open(file_path) as f:
+        while True:
+            block = f.read(TEXT_BLOCK_SIZE)
+            if not block:
+                break
+            buffer = carry + block
+            cut = buffer.rfind("\n\n")
+            # Separators match leftmost, so cut at the start of a newline run
+            while cut > 0 and buffer[cut - 1] == "\n":
+                cut -= 1
+            if cut <= 0 or "\n\n" not in buffer[:cut]:
+                # No complete paragraph yet; bound the carry for pathological input
+                if len(buffer) < 8 * TEXT_BLOCK_SIZE:
+                    carry = buffer
+                    continue
+                cut = len(buffer)
+            prefix = buffer[:cut]
+            spans = splitter.split_spans(prefix)
+            if len(spans) < 2 and cut < len(buffer):
+                carry = buffer
+                continue
+            
+            buffer_offset = carry_offset
+            resume = _resume_offset(prefix, spans[-1][0]) if cut < len(buffer) else -1
+            if resume > 0:
+                spans = spans[:-1]
+                cut = resume
+            carry = buffer[cut:]
+            carry_offset = buffer_offset + cut
+            for start, end in spans:
+                yield make_chunk(prefix, start, end, buffer_offset)
+    
+    if carry:
+        for start, end in splitter.split_spans(carry):
+            yield make_chunk(carry, start, end, carry_offset)
+
+
+@traced("iter_chunks")
+def iter_chunks(
+    file_path: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    file_hash: Optional[str] = None,
+    pdf_workers: Optional[int] = None
+) -> Iterator[Document]:
+    """Lazily load and chunk a document with bounded memory.
+
+    PDFs and DOCX files are read page by page and each page is split on
+    its own, exactly as ``chunk_documents`` does. Text files are streamed
+    in blocks with the unfinished tail carried across block boundaries.
+    ``pdf_workers`` caps the processes extracting PDF pages.
+    """
+    if file_hash is None:
+        file_hash = file_content_hash(file_path)
+    text_splitter = _make_splitter(chunk_size, chunk_overlap)
+    
+    _, ext = os.path.splitext(file_path)
+    if ext == '.txt':
+        chunks = _iter_text_chunks(file_path, text_splitter)
+    else:
+        chunks = (
+            chunk
+            for page in _iter_pages(file_path, pdf_workers)
+            for chunk in text_splitter.split_documents([page])
+        )
+    
+    yield from _tag_chunks(chunks, file_hash, os.path.basename(file_path))
+
+
+def iter_batches(chunks: Iterable[Document], batch_size: int = 256) -> Iterator[List[Document]]:
+    """Group a chunk stream into lists for indexing."""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class FileChunks(NamedTuple):
+    """Outcome of parsing one file in a batch."""
+    file_path: str
+    chunks: List[Document]
+    error: Optional[Exception] = None
+
+
+def _chunk_file(file_path: str, file_hash: Optional[str]) -> Tuple[List[Document], float]:
+    start = time.perf_counter()
+    # Already one file per process; don't start a nested pool for PDF pages
+    chunks = list(iter_chunks(file_path, file_hash=file_hash, pdf_workers=1))
+    return chunks, time.perf_counter() - start
+
+
+def load_and_chunk_many(
+    file_paths: List[str],
+    file_hashes: Optional[Dict[str, str]] = None,
+    max_workers: Optional[int] = None
+) -> Iterator[FileChunks]:
+    """Parse and chunk many files in a process pool.
+
+    Results are yielded in completion order. A file that fails to parse is
+    reported through ``FileChunks.error`` and does not stop the others.
+    """
+    if not file_paths:
+        return
+    file_hashes = file_hashes or {}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+    
+    with process_pool(max_workers) as pool:
+        futures = {
+            pool.submit(_chunk_file, path, file_hashes.get(path)): path
+            for path in file_paths
+        }
+        for future in as_completed(futures):
+            # Drop the finished future so its chunks can be freed once indexed
+            path = futures.pop(future)
+            try:
+                chunks, seconds = future.result()
+            except Exception as e:
+                yield FileChunks(path, [], e)
+                continue
+            if tracing_enabled():
+                # Spans recorded in the worker process never reach this one
+                observe("load_and_chunk_file", seconds)
+            yield FileChunks(path, chunks)
 
 
-def load_and_chunk(file_path: str) -> List[Document]:
+def load_and_chunk(file_path: str, file_hash: Optional[str] = None) -> List[Document]:
     """Load and chunk a document in one step."""
+    if file_hash is None:
+        file_hash = file_content_hash(file_path)
     docs = load_document(file_path)
-    chunks = chunk_documents(docs)
+    chunks = chunk_documents(docs, file_hash=file_hash)
     print(f"✓ Loaded {file_path}")
     print(f"✓ Created {len(chunks)} chunks")
     return chunks
@@ -0,0 +1,132 @@
+"""Persistent on-disk cache for document embeddings."""
+
+from typing import Dict, List
+from array import array
+from langchain_core.embeddings import Embeddings
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends unseen chunks to the backend.
+
+    Vectors are stored in a small SQLite file keyed by a hash of the model
+    name and chunk text. The least recently used entries are evicted once
+    the cache grows past ``max_entries``.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache_path: str = "embedding_cache.db",
+                 max_entries: int = 200_000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS embeddings
+                              (key TEXT PRIMARY KEY,
+                               vector BLOB NOT NULL,
+                               last_used REAL NOT NULL)''')
+        self._conn.execute('''CREATE INDEX IF NOT EXISTS idx_embeddings_last_used
+                              ON embeddings (last_used)''')
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors where possible."""
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            # Round to float32 so fresh and cached vectors are identical
+            fresh = {key: array('f', vector).tolist()
+                     for key, vector in zip(missing.keys(), vectors)}
+            self._store(fresh)
+            cached.update(fresh)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query (queries are not cached on disk)."""
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched request (not cached on disk)."""
+        return self.embeddings.embed_documents(texts)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array('f', vector).tobytes(), now) for key, vector in vectors.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries beyond ``max_entries``."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                """DELETE FROM embeddings WHERE key IN
+                   (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)""",
+                (excess,)
+            )
+
+    def stats(self) -> Dict:
+        """Get cache hit/miss statistics."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries
+            }
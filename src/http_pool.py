@@ -0,0 +1,32 @@
+"""Process-wide pooled HTTP connections for the API clients."""
+
+from typing import TYPE_CHECKING, Optional
+import os
+import threading
+
+if TYPE_CHECKING:
+    import httpx
+
+_client: Optional["httpx.Client"] = None
+_client_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    """Connections kept open per upstream host (``HTTP_POOL_SIZE``)."""
+    return int(os.getenv('HTTP_POOL_SIZE', '100'))
+
+
+def shared_http_client() -> "httpx.Client":
+    """One thread-safe keep-alive pool shared by the OpenAI and Groq clients."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                
+                size = pool_size()
+                _client = httpx.Client(
+                    limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+                    follow_redirects=True
+                )
+    return _client
@@ -0,0 +1,211 @@
+"""Pipelined embed-and-upsert indexing with backpressure."""
+
+from typing import Callable, Dict, Iterable, List, Optional
+from langchain_core.documents import Document
+import queue
+import random
+import sys
+import threading
+import time
+
+try:
+    from .document_loader import iter_batches
+except ImportError:
+    from document_loader import iter_batches
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+def _network_errors() -> tuple:
+    """Network error types of the HTTP clients, for those already imported.
+
+    An SDK that was never imported can't have raised, so this doesn't
+    import one just to check.
+    """
+    types = [ConnectionError, TimeoutError]
+    if 'httpx' in sys.modules:
+        types.append(sys.modules['httpx'].TransportError)
+    if 'openai' in sys.modules:
+        types.append(sys.modules['openai'].APIConnectionError)
+    return tuple(types)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether an API error is worth retrying (HTTP 429/5xx or a network error)."""
+    if isinstance(error, _network_errors()):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return False
+    return status == 429 or 500 <= status < 600
+
+
+def with_retries(fn: Callable, max_retries: int = 5, base_delay: float = 0.5,
+                 max_delay: float = 20.0) -> Callable:
+    """Wrap ``fn`` to retry transient errors with full-jitter exponential backoff."""
+    def wrapper(*args, **kwargs):
+        for attempt in range(max_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == max_retries or not is_transient_error(e):
+                    raise
+                time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+    return wrapper
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage.
+
+    ``chunks_per_second`` is measured against the time the stage's workers
+    were busy, so the slowest stage shows up as the lowest rate.
+    """
+    
+    def __init__(self):
+        self.chunks = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, chunks: int, seconds: float):
+        with self._lock:
+            self.chunks += chunks
+            self.busy_seconds += seconds
+    
+    def as_dict(self) -> Dict:
+        busy = self.busy_seconds
+        return {
+            "chunks": self.chunks,
+            "busy_seconds": round(busy, 4),
+            "chunks_per_second": round(self.chunks / busy, 2) if busy else 0.0
+        }
+
+
+class IndexingPipeline:
+    """Overlap chunk production, embedding and upserting.
+
+    The caller's thread pulls chunks from the input iterable and groups them
+    into batches. Embed workers and upsert workers run in their own threads.
+    The queues between stages are bounded, so a slow backend throttles
+    parsing instead of letting batches pile up in memory.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        upsert_fn: Callable[[List[Document], List[List[float]]], None],
+        batch_size: int = 64,
+        embed_workers: int = 2,
+        upsert_workers: int = 2,
+        queue_size: int = 4,
+        max_retries: int = 5,
+        retry_delay: float = 0.5
+    ):
+        self.embed_fn = with_retries(embed_fn, max_retries, retry_delay)
+        self.upsert_fn = with_retries(upsert_fn, max_retries, retry_delay)
+        self.batch_size = batch_size
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.queue_size = queue_size
+    
+    def run(self, documents: Iterable[Document],
+            on_progress: Optional[Callable[[int], None]] = None) -> Dict:
+        """Index every document; returns per-stage throughput stats."""
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        upsert_queue = queue.Queue(maxsize=self.queue_size)
+        stats = {"parse": StageStats(), "embed": StageStats(), "upsert": StageStats()}
+        errors = []
+        failed = threading.Event()
+        progress_lock = threading.Lock()
+        indexed = [0]
+        
+        def embed_worker():
+            while True:
+                batch = embed_queue.get()
+                if batch is _DONE:
+                    return
+                if failed.is_set():
+                    continue
+                try:
+                    start = time.perf_counter()
+                    vectors = self.embed_fn([doc.page_content for doc in batch])
+                    stats["embed"].record(len(batch), time.perf_counter() - start)
+                    _put(upsert_queue, (batch, vectors), failed)
+                except Exception as e:
+                    errors.append(e)
+                    failed.set()
+        
+        def upsert_worker():
+            while True:
+                item = upsert_queue.get()
+                if item is _DONE:
+                    return
+                if failed.is_set():
+                    continue
+                batch, vectors = item
+                try:
+                    start = time.perf_counter()
+                    self.upsert_fn(batch, vectors)
+                    stats["upsert"].record(len(batch), time.perf_counter() - start)
+                    with progress_lock:
+                        indexed[0] += len(batch)
+                        if on_progress:
+                            on_progress(indexed[0])
+                except Exception as e:
+                    errors.append(e)
+                    failed.set()
+        
+        embedders = [threading.Thread(target=embed_worker, daemon=True)
+                     for _ in range(self.embed_workers)]
+        upserters = [threading.Thread(target=upsert_worker, daemon=True)
+                     for _ in range(self.upsert_workers)]
+        for worker in embedders + upserters:
+            worker.start()
+        
+        started = time.perf_counter()
+        try:
+            batches = iter_batches(documents, self.batch_size)
+            while not failed.is_set():
+                start = time.perf_counter()
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                stats["parse"].record(len(batch), time.perf_counter() - start)
+                _put(embed_queue, batch, failed)
+        except Exception as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            for _ in embedders:
+                embed_queue.put(_DONE)
+            for worker in embedders:
+                worker.join()
+            for _ in upserters:
+                upsert_queue.put(_DONE)
+            for worker in upserters:
+                worker.join()
+        
+        if errors:
+            raise errors[0]
+        
+        elapsed = time.perf_counter() - started
+        result = {name: stage.as_dict() for name, stage in stats.items()}
+        result["chunks"] = indexed[0]
+        result["seconds"] = round(elapsed, 4)
+        result["chunks_per_second"] = round(indexed[0] / elapsed, 2) if elapsed else 0.0
+        return result
+
+
+def _put(q: queue.Queue, item, failed: threading.Event):
+    """Blocking put that gives up once the pipeline has failed."""
+    while not failed.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
@@ -0,0 +1,154 @@
+"""Index chunked files and keep document records in sync."""
+
+from typing import Callable, Dict, Iterable, List, Optional
+from langchain_core.documents import Document
+import threading
+
+try:
+    from .document_loader import iter_chunks, load_and_chunk_many
+except ImportError:
+    from document_loader import iter_chunks, load_and_chunk_many
+
+# Files parsed in the process pool come back as whole chunk lists, so
+# larger ones are streamed chunk by chunk in this process instead
+POOL_MAX_FILE_BYTES = 8 << 20
+
+
+def index_file(
+    vector_store,
+    db,
+    filename: str,
+    file_size: int,
+    file_hash: str,
+    chunks: Iterable[Document],
+    previous: Optional[Dict] = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """Index one file's chunks and replace its previous version.
+
+    ``previous`` is the file's active ``documents`` row, if any. Chunk IDs
+    follow chunk text, so only chunks that are new to this version are
+    embedded and upserted, and those the previous version had but this one
+    lacks are deleted once it is indexed. Unchanged chunks that moved are
+    upserted again so their stored ``chunk_index`` stays right; their
+    vectors come from the embedding cache. Returns the chunk count.
+    """
+    indexed = db.get_document_chunks(filename) if previous else {}
+    chunk_ids: Dict[str, int] = {}
+    
+    def changed_chunks():
+        for chunk in chunks:
+            chunk_id, position = chunk.metadata['chunk_id'], chunk.metadata['chunk_index']
+            chunk_ids[chunk_id] = position
+            if indexed.get(chunk_id) != position:
+                yield chunk
+    
+    vector_store.create_index(changed_chunks(), on_progress=on_progress)
+    
+    # Chunks of the previous version that this one no longer has
+    stale = [chunk_id for chunk_id in indexed if chunk_id not in chunk_ids]
+    if stale:
+        vector_store.delete(stale)
+    
+    db.save_document(
+        filename=filename,
+        file_size=file_size,
+        chunk_count=len(chunk_ids),
+        file_hash=file_hash,
+        chunks=chunk_ids
+    )
+    return len(chunk_ids)
+
+
+class IngestionWorker:
+    """Runs queued ingestion jobs on a background thread.
+
+    Jobs and their per-file progress live in the chat database, so
+    ingestion carries on across Streamlit reruns, and a job cut short by a
+    restart resumes with the first file that hadn't finished.
+    """
+    
+    def __init__(self, vector_store, db, poll_interval: float = 5.0):
+        self.vector_store = vector_store
+        self.db = db
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """Requeue interrupted jobs and start the worker thread (once)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            resumed = self.db.requeue_interrupted_jobs()
+            if resumed:
+                print(f"✓ Resuming {resumed} interrupted ingestion jobs")
+            self._thread = threading.Thread(target=self._run, daemon=True, name="ingestion-worker")
+            self._thread.start()
+    
+    def submit(self, session_id: str, files: List[Dict]) -> int:
+        """Queue files for ingestion and return the job ID.
+
+        Each file is a dict with ``filename``, ``file_path``, ``file_size``
+        and ``file_hash``.
+        """
+        job_id = self.db.create_job(session_id, files)
+        self._wake.set()
+        return job_id
+    
+    def _run(self):
+        while True:
+            job_id = self.db.claim_next_job()
+            if job_id is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            try:
+                self.run_job(job_id)
+                self.db.finish_job(job_id)
+            except Exception as e:
+                print(f"⚠ Ingestion job {job_id} failed: {e}")
+                self.db.finish_job(job_id, "failed", str(e))
+    
+    def run_job(self, job_id: int):
+        """Index a job's pending files, skipping those already indexed unchanged."""
+        todo = {}
+        for job_file in self.db.get_job_files(job_id):
+            if job_file['status'] != 'pending':
+                continue
+            previous = self.db.get_document(job_file['filename'])
+            if previous and previous['file_hash'] == job_file['file_hash']:
+                self.db.update_job_file(job_file['id'], 'skipped', previous['chunk_count'])
+                continue
+            todo[job_file['file_path']] = (job_file, previous)
+        
+        pooled = [path for path, (job_file, _) in todo.items() if job_file['file_size'] <= POOL_MAX_FILE_BYTES]
+        if len(pooled) > 1:
+            # Several small files: parse in parallel, index each as it finishes
+            file_hashes = {path: todo[path][0]['file_hash'] for path in pooled}
+            for result in load_and_chunk_many(pooled, file_hashes):
+                job_file, previous = todo.pop(result.file_path)
+                if result.error:
+                    self.db.update_job_file(job_file['id'], 'failed', error=str(result.error))
+                    continue
+                self._index(job_file, previous, result.chunks)
+        
+        # Large files (or a single one): stream chunks straight into the index
+        for path, (job_file, previous) in todo.items():
+            self._index(job_file, previous, iter_chunks(path, file_hash=job_file['file_hash']))
+    
+    def _index(self, job_file: Dict, previous: Optional[Dict], chunks: Iterable[Document]):
+        file_id = job_file['id']
+        self.db.update_job_file(file_id, 'indexing', 0)
+        try:
+            chunk_count = index_file(
+                self.vector_store, self.db, job_file['filename'], job_file['file_size'],
+                job_file['file_hash'], chunks, previous,
+                on_progress=lambda n: self.db.update_job_file(file_id, 'indexing', n)
+            )
+            self.db.update_job_file(file_id, 'done', chunk_count)
+            print(f"✓ Indexed {job_file['filename']} ({chunk_count} chunks)")
+        except Exception as e:
+            print(f"⚠ Failed to index {job_file['filename']}: {e}")
+            self.db.update_job_file(file_id, 'failed', error=str(e))
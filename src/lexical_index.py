@@ -0,0 +1,115 @@
+"""SQLite FTS5 keyword index over chunk text."""
+
+from typing import List
+from langchain_core.documents import Document
+import json
+import os
+import re
+import sqlite3
+import threading
+
+try:
+    from .tracing import traced
+except ImportError:
+    from tracing import traced
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks
+    (id INTEGER PRIMARY KEY,
+     chunk_id TEXT NOT NULL UNIQUE,
+     text TEXT NOT NULL,
+     metadata TEXT NOT NULL);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts
+    USING fts5(text, content='chunks', content_rowid='id');
+
+CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# Longer queries add little recall and slow down BM25 scoring
+MAX_QUERY_TERMS = 32
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into a safe FTS5 query: any quoted term may match.
+
+    Quoting keeps user input from being parsed as FTS5 syntax, and an
+    identifier like ``ERR-404`` becomes the phrase "err 404".
+    """
+    terms = [term for term in query.split() if re.search(r"\w", term)]
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms[:MAX_QUERY_TERMS])
+
+
+class LexicalIndex:
+    """BM25 search over chunk text, keyed by the same chunk IDs as the vectors."""
+    
+    def __init__(self, db_path: str = "lexical_index.db"):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=10.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+    
+    def add(self, ids: List[str], documents: List[Document]):
+        """Add or replace chunks."""
+        rows = [
+            (id_, doc.page_content, json.dumps(doc.metadata, default=str))
+            for id_, doc in zip(ids, documents)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("""INSERT INTO chunks (chunk_id, text, metadata)
+                                      VALUES (?, ?, ?)
+                                      ON CONFLICT (chunk_id) DO UPDATE SET
+                                          text = excluded.text,
+                                          metadata = excluded.metadata""", rows)
+    
+    def delete(self, ids: List[str]):
+        """Delete chunks by chunk ID."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?",
+                                   [(id_,) for id_ in ids])
+    
+    @traced("search.lexical")
+    def search(self, query: str, k: int = 10) -> List[Document]:
+        """Best BM25 matches first; ``metadata['bm25']`` is higher for better matches."""
+        match = to_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute("""SELECT c.text, c.metadata, bm25(chunks_fts) AS rank
+                                         FROM chunks_fts
+                                         JOIN chunks c ON c.id = chunks_fts.rowid
+                                         WHERE chunks_fts MATCH ?
+                                         ORDER BY rank LIMIT ?""", (match, k)).fetchall()
+        
+        results = []
+        for text, metadata, rank in rows:
+            metadata = json.loads(metadata)
+            metadata['bm25'] = -rank
+            results.append(Document(page_content=text, metadata=metadata))
+        return results
+    
+    def count(self) -> int:
+        """Number of indexed chunks."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
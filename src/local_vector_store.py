@@ -0,0 +1,421 @@
+"""In-process vector store backed by memory-mapped NumPy rows."""
+
+from typing import Dict, Iterable, List, Optional, Set
+from langchain_core.documents import Document
+import numpy as np
+import json
+import os
+import re
+import sqlite3
+import threading
+
+try:
+    from .vector_store import BaseVectorStore, document_ids, make_lexical_index
+    from .ann_index import IVFIndex
+    from .tracing import traced
+    from . import query_cache
+except ImportError:
+    from vector_store import BaseVectorStore, document_ids, make_lexical_index
+    from ann_index import IVFIndex
+    from tracing import traced
+    import query_cache
+
+# Below this many vectors an exact scan is fast enough without an ANN index
+ANN_MIN_VECTORS = 50000
+
+# Row files start with room for this many rows and double when full
+MIN_CAPACITY = 1024
+
+# Deleted rows are reclaimed once they are this share of the rows on disk
+COMPACT_DEAD_SHARE = 0.25
+
+# Rows copied at a time when compacting, and IDs per SQL statement
+COPY_BLOCK_ROWS = 65536
+SQL_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, via partial sort."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class RowFile:
+    """Fixed-width rows in a raw file, memory-mapped and grown by doubling.
+
+    Growing extends the file in place, so appending never rewrites the
+    rows already on disk.
+    """
+    
+    def __init__(self, path: str, dtype, dims: int):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.dims = dims
+        self.array: Optional[np.memmap] = None
+        if os.path.exists(path):
+            self._map()
+    
+    def _map(self):
+        capacity = os.path.getsize(self.path) // (self.dtype.itemsize * self.dims)
+        self.array = None
+        if capacity:
+            self.array = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(capacity, self.dims))
+    
+    @property
+    def capacity(self) -> int:
+        return 0 if self.array is None else len(self.array)
+    
+    def reserve(self, rows: int):
+        """Make room for at least ``rows`` rows."""
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity, MIN_CAPACITY)
+        self.close()
+        with open(self.path, "ab") as f:
+            f.truncate(capacity * self.dtype.itemsize * self.dims)
+        self._map()
+    
+    def flush(self):
+        if self.array is not None:
+            self.array.flush()
+    
+    def close(self):
+        self.flush()
+        self.array = None
+
+
+class LocalVectorStore(BaseVectorStore):
+    """Exact cosine search over normalized embeddings held on local disk.
+
+    Vectors are rows of a raw float32 file that is memory-mapped, so only
+    the pages touched by a search are read, and that grows in place, so
+    a flush writes only the rows upserted since the last one. Chunk text
+    and metadata live in ``records.db`` and are read only for search
+    results. Deleted rows are skipped by searches until they make up
+    ``COMPACT_DEAD_SHARE`` of the file; then the live rows are copied into
+    a new generation of the row files.
+
+    With ``ann=True``, indexes of ``ANN_MIN_VECTORS`` or more also keep an
+    IVF index in ``ivf.npz`` and search only the ``nprobe`` nearest cells,
+    trading a little recall for latency.
+    """
+    
+    def __init__(self, index_dir: str = "local_index", embeddings=None,
+                 ann: bool = False, nprobe: int = 16):
+        self.index_dir = index_dir
+        self.embeddings = embeddings
+        self.records_path = os.path.join(index_dir, "records.db")
+        self.ann_path = os.path.join(index_dir, "ivf.npz")
+        self.lexical_index = make_lexical_index(os.path.join(index_dir, "lexical.db"))
+        self.ann = ann
+        self.nprobe = nprobe
+        
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[RowFile] = None
+        self._generation = 0
+        # Rows searchable, and rows written including upserts not yet flushed
+        self._rows = 0
+        self._next_row = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._live_count = 0
+        self._updated: Set[int] = set()
+        self._ann: Optional[IVFIndex] = None
+        self._dirty = False
+        self._load()
+        print(f"✓ Opened local index: {index_dir} ({self.count()} vectors)")
+    
+    def _load(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._db = sqlite3.connect(self.records_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(_SCHEMA)
+        info = self._info()
+        self._generation = info.get("generation", 0)
+        self._rows = self._next_row = info.get("rows", 0)
+        self._remove_stale_files()
+        if "dims" in info:
+            self._open_row_files(info["dims"])
+        
+        live = np.fromiter((row for row, in self._db.execute("SELECT row FROM records")), dtype=np.int64)
+        self._live = np.zeros(self._rows, dtype=bool)
+        self._live[live] = True
+        self._live_count = len(live)
+        if self.ann and os.path.exists(self.ann_path):
+            self._ann = IVFIndex.load(self.ann_path)
+        self._sync_ann()
+        if "dims" not in info:
+            self._import_npy_index()
+    
+    def _import_npy_index(self):
+        """Move an index written as ``vectors.npy`` and ``documents.json`` into the row files."""
+        vectors_path = os.path.join(self.index_dir, "vectors.npy")
+        documents_path = os.path.join(self.index_dir, "documents.json")
+        if not (os.path.exists(vectors_path) and os.path.exists(documents_path)):
+            return
+        with open(documents_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        matrix = np.load(vectors_path, mmap_mode="r")
+        for start in range(0, len(records), COPY_BLOCK_ROWS):
+            block = records[start:start + COPY_BLOCK_ROWS]
+            documents = [Document(page_content=record["text"], metadata=record["metadata"]) for record in block]
+            self._write([record["id"] for record in block], documents, matrix[start:start + len(block)])
+        self.flush()
+        del matrix
+        for name in os.listdir(self.index_dir):
+            if name.endswith(".npy") or name == "documents.json":
+                os.remove(os.path.join(self.index_dir, name))
+        print(f"✓ Converted {len(records)} vectors to the growable index format")
+    
+    def _info(self) -> Dict:
+        return dict(self._db.execute("SELECT key, value FROM info"))
+    
+    def _set_info(self, **values):
+        self._db.executemany("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", values.items())
+    
+    def _data_path(self, name: str, generation: int) -> str:
+        return os.path.join(self.index_dir, f"{name}.{generation}.bin")
+    
+    def _row_files(self, generation: int, dims: int) -> Dict[str, RowFile]:
+        """The row files of a generation, by the attribute that holds each."""
+        return {"_vectors": RowFile(self._data_path("vectors", generation), np.float32, dims)}
+    
+    def _open_row_files(self, dims: int):
+        for attr, row_file in self._row_files(self._generation, dims).items():
+            setattr(self, attr, row_file)
+    
+    def _remove_stale_files(self):
+        """Delete row files of other generations, e.g. left by a crash mid-compaction."""
+        for name in os.listdir(self.index_dir):
+            match = re.search(r"\.(\d+)\.bin$", name)
+            if match and int(match.group(1)) != self._generation:
+                os.remove(os.path.join(self.index_dir, name))
+    
+    def _select_in(self, query: str, values: List) -> List[tuple]:
+        """Run ``query`` with its ``IN ({})`` list filled from ``values``, in batches."""
+        rows = []
+        for start in range(0, len(values), SQL_BATCH):
+            batch = values[start:start + SQL_BATCH]
+            rows.extend(self._db.execute(query.format(",".join("?" * len(batch))), batch))
+        return rows
+    
+    def _rows_for(self, ids: Iterable[str]) -> Dict[str, int]:
+        """Rows holding the given chunk IDs, for those that are stored."""
+        return dict(self._select_in("SELECT id, row FROM records WHERE id IN ({})", list(ids)))
+    
+    @property
+    def _matrix(self) -> Optional[np.ndarray]:
+        """The searchable rows, memory-mapped (deleted rows included)."""
+        if self._vectors is None or self._vectors.array is None:
+            return None
+        return self._vectors.array[:self._rows]
+    
+    def _sync_ann(self):
+        """Bring the IVF index up to date with the vectors on disk."""
+        updated, self._updated = self._updated, set()
+        if not self.ann or self._matrix is None or len(self._matrix) < ANN_MIN_VECTORS:
+            # An index that isn't kept up to date must not be loaded later
+            self._ann = None
+            if os.path.exists(self.ann_path):
+                os.remove(self.ann_path)
+            return
+        ann = self._ann
+        if ann is not None and len(ann) <= len(self._matrix) and not ann.needs_training(len(self._matrix)):
+            updated = sorted(row for row in updated if row < len(ann))
+            if not updated and len(ann) == len(self._matrix):
+                return
+            ann.reassign(updated, self._matrix[updated])
+            ann.add(self._matrix[len(ann):])
+        else:
+            print(f"Training IVF index over {len(self._matrix)} vectors...")
+            ann = IVFIndex.train(self._matrix)
+            print(f"✓ Trained IVF index ({ann.n_lists} lists)")
+        ann.save(self.ann_path)
+        self._ann = ann
+    
+    def upsert_vectors(self, documents: List[Document], vectors: List[List[float]]):
+        """Write one embedded batch into the row files; ``flush`` commits it."""
+        self._write(document_ids(documents), documents, vectors)
+    
+    def _write(self, ids: List[str], documents: List[Document], vectors):
+        vectors = normalize(vectors)
+        with self._lock:
+            if self._vectors is None:
+                self._open_row_files(vectors.shape[1])
+                self._set_info(dims=vectors.shape[1])
+            rows = self._rows_for(ids)
+            records = []
+            for id_, doc, vector in zip(ids, documents, vectors):
+                row = rows.get(id_)
+                if row is None:
+                    row = rows[id_] = self._next_row
+                    self._next_row += 1
+                    self._vectors.reserve(self._next_row)
+                elif row < self._rows:
+                    self._updated.add(row)
+                self._vectors.array[row] = vector
+                records.append((row, id_, doc.page_content, json.dumps(doc.metadata, default=str)))
+            self._db.executemany("INSERT OR REPLACE INTO records (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                                 records)
+            self._dirty = True
+    
+    def flush(self):
+        """Commit upserts to disk and make new rows searchable."""
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = np.concatenate([np.array(sorted(self._updated), dtype=np.int64),
+                                   np.arange(self._rows, self._next_row)])
+            self._flush_rows(rows)
+            # Rows reach the disk before the records that point at them
+            self._vectors.flush()
+            self._set_info(rows=self._next_row)
+            self._db.commit()
+            added = self._next_row - self._rows
+            self._live = np.concatenate([self._live, np.ones(added, dtype=bool)])
+            self._live_count += added
+            self._rows = self._next_row
+            self._sync_ann()
+            self._dirty = False
+    
+    def _flush_rows(self, rows: np.ndarray):
+        """Bring other row files up to date with the vectors written to ``rows`` (subclasses)."""
+    
+    def delete(self, ids: List[str]):
+        """Delete vectors by chunk ID."""
+        with self._lock:
+            self.flush()
+            doomed = list(self._rows_for(ids).values())
+            if not doomed:
+                return
+            self._select_in("DELETE FROM records WHERE row IN ({})", doomed)
+            self._db.commit()
+            self._live[doomed] = False
+            self._live_count -= len(doomed)
+            if self._rows - self._live_count > COMPACT_DEAD_SHARE * self._rows:
+                self._compact()
+            if self.lexical_index is not None:
+                self.lexical_index.delete(ids)
+        query_cache.bump_index_generation()
+        print(f"✓ Deleted {len(doomed)} stale vectors")
+    
+    def _compact(self):
+        """Copy the live rows into a new generation of the row files."""
+        keep = np.flatnonzero(self._live)
+        generation = self._generation + 1
+        row_files = self._row_files(generation, self._vectors.dims)
+        for attr, target in row_files.items():
+            source = getattr(self, attr)
+            target.reserve(len(keep))
+            for start in range(0, len(keep), COPY_BLOCK_ROWS):
+                block = keep[start:start + COPY_BLOCK_ROWS]
+                target.array[start:start + len(block)] = source.array[block]
+            target.flush()
+        
+        # In ascending order every row moves down into a slot already vacated
+        self._db.executemany("UPDATE records SET row = ? WHERE row = ?",
+                             ((new, int(old)) for new, old in enumerate(keep) if new != old))
+        self._set_info(generation=generation, rows=len(keep))
+        self._db.commit()
+        
+        for attr, target in row_files.items():
+            getattr(self, attr).close()
+            setattr(self, attr, target)
+        self._generation = generation
+        self._rows = self._next_row = self._live_count = len(keep)
+        self._live = np.ones(len(keep), dtype=bool)
+        self._remove_stale_files()
+        if self._ann is not None:
+            self._ann = self._ann.select(keep)
+            self._ann.save(self.ann_path)
+        self._sync_ann()
+    
+    @traced("search.dense")
+    def dense_search(self, query: str, k: int = 3) -> List[Document]:
+        """Search for similar documents by embedding."""
+        return self.search_by_vector(self.embed_query(query), k)
+    
+    def search_by_vector(self, vector: List[float], k: int = 3) -> List[Document]:
+        """Cosine search for an already-embedded query."""
+        query_vector = normalize(vector)
+        with self._lock:
+            if not self._live_count:
+                return []
+            rows = self._ann_candidates(query_vector)
+            if rows is None:
+                scores = self._matrix @ query_vector
+                self._mask_deleted(scores)
+                best = top_k(scores, min(k, self._live_count))
+                return self._results(best, scores[best])
+            scores = np.asarray(self._matrix[rows]) @ query_vector
+            best = top_k(scores, k)
+            return self._results(rows[best], scores[best])
+    
+    def _mask_deleted(self, scores: np.ndarray):
+        """Rank deleted rows below every live row in a full scan."""
+        if self._live_count < self._rows:
+            scores[~self._live] = -np.inf
+    
+    def _ann_candidates(self, query_vector: np.ndarray) -> Optional[np.ndarray]:
+        """Live rows in the IVF cells nearest the query, or None to scan every row."""
+        if self._ann is None or len(self._ann) != len(self._matrix):
+            return None
+        rows = self._ann.candidates(query_vector, self.nprobe)
+        return rows[self._live[rows]]
+    
+    def _results(self, rows: np.ndarray, scores: np.ndarray) -> List[Document]:
+        """Documents for matrix rows, with each row's score in its metadata."""
+        rows = [int(row) for row in rows]
+        records = {
+            row: (text, metadata)
+            for row, text, metadata in self._select_in(
+                "SELECT row, text, metadata FROM records WHERE row IN ({})", rows
+            )
+        }
+        results = []
+        for row, score in zip(rows, scores):
+            text, metadata = records[row]
+            metadata = dict(json.loads(metadata), score=float(score))
+            results.append(Document(page_content=text, metadata=metadata))
+        return results
+    
+    def candidate_vectors(self, documents: List[Document]) -> List[List[float]]:
+        """Stored rows for retrieved chunks, avoiding a trip to the embedder."""
+        with self._lock:
+            ids = [doc.metadata['chunk_id'] if 'file_hash' in doc.metadata else None for doc in documents]
+            stored = self._rows_for(id_ for id_ in ids if id_ is not None)
+            rows = [stored.get(id_) for id_ in ids]
+            if self._dirty or None in rows:
+                return super().candidate_vectors(documents)
+            return np.asarray(self._matrix[rows])
+    
+    def count(self) -> int:
+        """Number of vectors in the local index."""
+        return self._live_count
@@ -0,0 +1,103 @@
+"""Page-by-page PDF text extraction straight from pypdf, spread over worker processes."""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import TYPE_CHECKING, Iterator, List, Optional
+import math
+import multiprocessing
+import os
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from pypdf import PageObject
+
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 32
+
+# Each worker gets a few page ranges so a slow range doesn't hold the rest back
+RANGES_PER_WORKER = 4
+
+# Form XObjects nest; fonts deeper than this are not looked for
+MAX_FORM_DEPTH = 3
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """A pool of worker processes that is safe to start from the app."""
+    # Spawn rather than fork: the Streamlit server process is multi-threaded
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _has_fonts(resources, depth: int = 0) -> bool:
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if resources.get("/Font"):
+        return True
+    if depth >= MAX_FORM_DEPTH:
+        return False
+    xobjects = resources.get("/XObject")
+    if not xobjects:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Form" and _has_fonts(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def has_text_layer(page: "PageObject") -> bool:
+    """Whether a page uses any font, directly or through form XObjects.
+
+    Text can't be drawn without a font, so pages without one (scans,
+    full-page images) are skipped without parsing their content streams.
+    """
+    return _has_fonts(page.get("/Resources"))
+
+
+def extract_page_text(page: "PageObject") -> str:
+    """Text of one page, as ``PyPDFLoader`` extracts it."""
+    if not has_text_layer(page):
+        return ""
+    return page.extract_text(extraction_mode="plain")
+
+
+def _extract_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract pages ``start``..``stop - 1`` in a worker process."""
+    from pypdf import PdfReader
+    
+    reader = PdfReader(file_path)
+    return [extract_page_text(reader.pages[number]) for number in range(start, stop)]
+
+
+def iter_pdf_pages(file_path: str, max_workers: Optional[int] = None) -> Iterator["Document"]:
+    """Yield one Document per page, in page order.
+
+    Metadata matches ``PyPDFLoader``: the ``source`` path and the 0-based
+    ``page`` number. Large files are split into page ranges extracted in
+    a process pool; ``max_workers=1`` keeps extraction in this process,
+    e.g. when already running inside a pool.
+    """
+    # Imported here so worker processes, which only need pypdf, start faster
+    from langchain_core.documents import Document
+    from pypdf import PdfReader
+    
+    reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+    if max_workers is None:
+        max_workers = int(os.getenv('PDF_WORKERS', '0')) or os.cpu_count() or 1
+    
+    if max_workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        texts = (extract_page_text(page) for page in reader.pages)
+        for number, text in enumerate(texts):
+            yield Document(page_content=text, metadata={'source': file_path, 'page': number})
+        return
+    
+    step = math.ceil(page_count / (max_workers * RANGES_PER_WORKER))
+    starts = list(range(0, page_count, step))
+    stops = [min(start + step, page_count) for start in starts]
+    
+    with process_pool(min(max_workers, len(starts))) as pool:
+        # map returns ranges in order while later ones are still extracting
+        texts = chain.from_iterable(pool.map(_extract_range, [file_path] * len(starts), starts, stops))
+        for number, text in enumerate(texts):
+            yield Document(page_content=text, metadata={'source': file_path, 'page': number})
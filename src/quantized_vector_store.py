@@ -0,0 +1,169 @@
+"""Local vector store that scans compact quantized codes and rescores exactly."""
+
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+import numpy as np
+import os
+
+try:
+    from .local_vector_store import LocalVectorStore, RowFile, normalize, top_k
+except ImportError:
+    from local_vector_store import LocalVectorStore, RowFile, normalize, top_k
+
+QUANTIZATIONS = ("int8", "float16")
+
+# Rows scanned at a time, so a search's scratch memory stays small
+SCAN_BLOCK_BYTES = 16 << 20
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compact codes for unit-length rows, plus per-row scales for int8.
+
+    int8 maps each row's largest absolute component to 127, so the
+    dequantized row is ``codes * scale``.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if quantization == "float16":
+        return matrix.astype(np.float16), None
+    peaks = np.abs(matrix).max(axis=1) if len(matrix) else np.empty(0, dtype=np.float32)
+    scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+class QuantizedVectorStore(LocalVectorStore):
+    """Local index that keeps int8 or float16 codes hot and float32 vectors cold.
+
+    Searches scan the codes (4x or 2x smaller than the float32 rows),
+    then rescore the best ``rescore_factor * k`` candidates against the
+    full-precision vector rows, which are memory-mapped and read only
+    for those rows. Returned scores are exact cosine similarities.
+    NumPy widens float16 slowly, so int8 is both smaller and faster.
+    Codes grow in place like the vectors, and each flush quantizes only
+    the rows it wrote.
+    """
+    
+    def __init__(self, index_dir: str = "local_index", embeddings=None,
+                 quantization: str = "int8", rescore_factor: int = 10, min_candidates: int = 100,
+                 ann: bool = False, nprobe: int = 16):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.min_candidates = min_candidates
+        self._code_file: Optional[RowFile] = None
+        self._scale_file: Optional[RowFile] = None
+        super().__init__(index_dir=index_dir, embeddings=embeddings, ann=ann, nprobe=nprobe)
+    
+    def _row_files(self, generation: int, dims: int) -> Dict[str, RowFile]:
+        row_files = super()._row_files(generation, dims)
+        dtype = np.int8 if self.quantization == "int8" else np.float16
+        row_files["_code_file"] = RowFile(self._data_path(f"codes.{self.quantization}", generation), dtype, dims)
+        if self.quantization == "int8":
+            row_files["_scale_file"] = RowFile(self._data_path("scales", generation), np.float32, 1)
+        return row_files
+    
+    def _load(self):
+        super()._load()
+        if self._matrix is None:
+            return
+        # Codes of another quantization no longer match these vectors
+        stale = [f"codes.{other}" for other in QUANTIZATIONS if other != self.quantization]
+        if self.quantization != "int8":
+            stale.append("scales")
+        for name in stale:
+            if os.path.exists(self._data_path(name, self._generation)):
+                os.remove(self._data_path(name, self._generation))
+        info = self._info()
+        quantized = 0
+        if info.get("quantization") == self.quantization and info.get("quantized_generation") == self._generation:
+            quantized = info.get("quantized_rows", 0)
+        if quantized == self._rows:
+            return
+        # Index written by the plain local backend, or with another quantization
+        self._flush_rows(np.arange(quantized, self._rows))
+        self._db.commit()
+        print(f"✓ Quantized {self._rows - quantized} vectors to {self.quantization}")
+    
+    def _flush_rows(self, rows: np.ndarray):
+        """Quantize only the rows written since the last flush, in blocks."""
+        end = int(rows.max()) + 1 if len(rows) else 0
+        self._code_file.reserve(end)
+        if self._scale_file is not None:
+            self._scale_file.reserve(end)
+        step = self._block_rows(self._code_file.dims)
+        for start in range(0, len(rows), step):
+            block = rows[start:start + step]
+            block_codes, block_scales = quantize(self._vectors.array[block], self.quantization)
+            self._code_file.array[block] = block_codes
+            if block_scales is not None:
+                self._scale_file.array[block, 0] = block_scales
+        self._code_file.flush()
+        if self._scale_file is not None:
+            self._scale_file.flush()
+        self._set_info(quantization=self.quantization, quantized_rows=self._next_row,
+                       quantized_generation=self._generation)
+    
+    def _compact(self):
+        super()._compact()
+        self._set_info(quantized_rows=self._rows, quantized_generation=self._generation)
+        self._db.commit()
+    
+    @property
+    def _codes(self) -> Optional[np.ndarray]:
+        if self._code_file is None or self._code_file.array is None:
+            return None
+        return self._code_file.array[:self._rows]
+    
+    @property
+    def _scales(self) -> Optional[np.ndarray]:
+        if self._scale_file is None or self._scale_file.array is None:
+            return None
+        return self._scale_file.array[:self._rows, 0]
+    
+    @staticmethod
+    def _block_rows(dims: int) -> int:
+        return max(1, SCAN_BLOCK_BYTES // (4 * max(dims, 1)))
+    
+    def approximate_scores(self, query_vector: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot products of a unit-length query with the quantized rows (default: all)."""
+        codes, scales = self._codes, self._scales
+        if rows is not None:
+            codes = codes[rows]
+            scales = scales[rows] if scales is not None else None
+        scores = np.empty(len(codes), dtype=np.float32)
+        step = self._block_rows(codes.shape[1])
+        for start in range(0, len(codes), step):
+            # einsum widens the codes in small buffers instead of copying the block
+            np.einsum("ij,j->i", codes[start:start + step], query_vector,
+                      out=scores[start:start + step], casting="unsafe")
+        if scales is not None:
+            scores *= scales
+        return scores
+    
+    def search_by_vector(self, vector: List[float], k: int = 3) -> List[Document]:
+        """Scan the quantized codes, then rescore the best candidates exactly."""
+        query_vector = normalize(vector)
+        with self._lock:
+            if not self._live_count:
+                return []
+            
+            rows = self._ann_candidates(query_vector)
+            approximate = self.approximate_scores(query_vector, rows)
+            if rows is None:
+                self._mask_deleted(approximate)
+            candidates = top_k(approximate, max(k * self.rescore_factor, self.min_candidates))
+            if rows is not None:
+                candidates = rows[candidates]
+            candidates = candidates[self._live[candidates]]
+            # Read the full-precision rows in file order
+            candidates.sort()
+            exact = np.asarray(self._matrix[candidates]) @ query_vector
+            best = top_k(exact, k)
+            return self._results(candidates[best], exact[best])
+    
+    def memory_bytes(self) -> int:
+        """Bytes of vector data a search scans: the codes and their scales."""
+        if self._codes is None:
+            return 0
+        return self._codes.nbytes + (self._scales.nbytes if self._scales is not None else 0)
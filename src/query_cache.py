@@ -0,0 +1,94 @@
+"""In-memory caches for query embeddings and answers."""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+import hashlib
+import os
+import threading
+import time
+
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def index_generation() -> int:
+    """Counter that moves whenever the vector index changes."""
+    return _generation
+
+
+def bump_index_generation():
+    """Mark the vector index as changed, invalidating cached answers."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+def normalize_question(text: str) -> str:
+    """Case- and whitespace-insensitive form of a question for cache keys."""
+    return " ".join(text.lower().split())
+
+
+def fingerprint(values: Iterable[Any]) -> str:
+    """Stable short hash of an ordered sequence of values."""
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(str(value).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    With ``track_index=True`` entries are dropped once the index generation
+    has moved on since they were stored.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0, track_index: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.track_index = track_index
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, generation = entry
+                if expires_at > time.monotonic() and (
+                        not self.track_index or generation == _generation):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, _generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every session in the process
+query_embeddings = TTLCache(
+    max_size=int(os.getenv('QUERY_CACHE_SIZE', '2048')),
+    ttl=float(os.getenv('QUERY_CACHE_TTL', '3600'))
+)
+answers = TTLCache(
+    max_size=int(os.getenv('ANSWER_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('ANSWER_CACHE_TTL', '900')),
+    track_index=True
+)
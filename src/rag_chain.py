@@ -1,34 +1,52 @@
 """RAG chain for question answering."""
 
-from typing import List, Dict
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import Document
+from typing import Dict, Iterator, List, Optional
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.documents import Document
 from dotenv import load_dotenv
+import asyncio
 import os
+import threading
+
+try:
+    from .coalesce import SingleFlight
+    from .context_packer import PackedContext, pack_context
+    from .http_pool import shared_http_client
+    from .tracing import traced
+    from .vector_store import get_secret
+    from . import query_cache
+except ImportError:
+    from coalesce import SingleFlight
+    from context_packer import PackedContext, pack_context
+    from http_pool import shared_http_client
+    from tracing import traced
+    from vector_store import get_secret
+    import query_cache
 
 load_dotenv()
 
+# Identical questions over the same chunks from concurrent sessions share one LLM call
+_answers = SingleFlight("rag.query")
+_answer_streams = SingleFlight("rag.stream_query")
+
 
 class RAGChain:
-    """RAG chain for answering questions with citations."""
+    """RAG chain for answering questions with citations.
+
+    Holds no per-request state, so one instance can serve every session.
+    """
     
-    def __init__(self, model_name: str = "llama-3.3-70b-versatile"):
-        # Get API key (prioritize .env/os.getenv to avoid Streamlit secrets warning)
-        groq_key = os.getenv('GROQ_API_KEY')
-        if not groq_key:
-            try:
-                import streamlit as st
-                if hasattr(st, 'secrets') and 'GROQ_API_KEY' in st.secrets:
-                    groq_key = st.secrets['GROQ_API_KEY']
-            except:
-                pass
+    def __init__(self, model_name: str = "llama-3.3-70b-versatile",
+                 context_budget: Optional[int] = None, llm=None):
+        self.model_name = model_name
+        # Upper bound on context tokens per prompt (0 disables the limit)
+        if context_budget is None:
+            context_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+        self.context_budget = context_budget or None
         
-        self.llm = ChatGroq(
-            model=model_name,
-            temperature=0.1,
-            groq_api_key=groq_key
-        )
+        # The Groq client is built on first use (or by warm_up)
+        self._llm = llm
+        self._llm_lock = threading.Lock()
         
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are a helpful AI assistant that answers questions based on provided context.
@@ -45,39 +63,185 @@ Context:
             ("human", "{question}")
         ])
     
+    @property
+    def llm(self):
+        """The chat model, built on first use."""
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = self._make_llm()
+        return self._llm
+    
+    def _make_llm(self):
+        from langchain_groq import ChatGroq
+        
+        return ChatGroq(
+            model=self.model_name,
+            temperature=0.1,
+            groq_api_key=get_secret('GROQ_API_KEY'),
+            http_client=shared_http_client()
+        )
+    
+    def warm_up(self):
+        """Build the LLM client ahead of the first request."""
+        self.llm
+    
+    def build_context(self, documents: List[Document]) -> PackedContext:
+        """Pack retrieved documents into the context token budget."""
+        return pack_context(documents, self.context_budget)
+    
     def format_context(self, documents: List[Document]) -> str:
         """Format retrieved documents as context."""
-        context_parts = []
-        for i, doc in enumerate(documents, 1):
-            source = doc.metadata.get('source', 'Unknown')
-            chunk_id = doc.metadata.get('chunk_id', 'N/A')
-            context_parts.append(
-                f"[Source {i}: {source}, Chunk {chunk_id}]\n{doc.page_content}\n"
-            )
-        return "\n".join(context_parts)
+        return self.build_context(documents).text
     
+    def format_sources(self, documents: List[Document]) -> List[Dict]:
+        """Citation entries shown under an answer."""
+        return [
+            {
+                "source": doc.metadata.get('source', 'Unknown'),
+                "chunk_id": doc.metadata.get('chunk_id', 'N/A'),
+                "content": doc.page_content[:200] + "..."
+            }
+            for doc in documents
+        ]
+    
+    def _answer_key(self, question: str, documents: List[Document]) -> tuple:
+        """Cache key for a question answered from a specific set of chunks."""
+        chunk_ids = [
+            f"{doc.metadata.get('source', 'Unknown')}:{doc.metadata.get('chunk_id', 'N/A')}"
+            for doc in documents
+        ]
+        return (
+            self.model_name,
+            query_cache.normalize_question(question),
+            query_cache.fingerprint(chunk_ids)
+        )
+    
+    @traced("rag.query")
     def query(self, question: str, documents: List[Document]) -> Dict:
-        """Answer a question using retrieved documents."""
-        context = self.format_context(documents)
+        """Answer a question using retrieved documents.
+
+        Identical question/context pairs are answered from a cache until the
+        index changes, and concurrent ones share a single LLM call.
+        """
+        key = self._answer_key(question, documents)
+        cached = query_cache.answers.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        return dict(_answers.do(key, self._answer, key, question, documents))
+    
+    def _answer(self, key: tuple, question: str, documents: List[Document]) -> Dict:
+        context = self.build_context(documents)
         
         # Generate answer
         chain = self.prompt_template | self.llm
         response = chain.invoke({
-            "context": context,
+            "context": context.text,
             "question": question
         })
-        
-        return {
-            "answer": response.content,
-            "sources": [
-                {
-                    "source": doc.metadata.get('source', 'Unknown'),
-                    "chunk_id": doc.metadata.get('chunk_id', 'N/A'),
-                    "content": doc.page_content[:200] + "..."
-                }
-                for doc in documents
-            ]
+        return self._cache_answer(key, response.content, documents, context)
+    
+    def _cache_answer(self, key: tuple, answer: str, documents: List[Document],
+                      context: PackedContext) -> Dict:
+        result = {
+            "answer": answer,
+            "sources": self.format_sources(documents),
+            "context_tokens": context.tokens
         }
+        query_cache.answers.set(key, result)
+        return result
+    
+    @traced("rag.aquery")
+    async def aquery(self, question: str, documents: List[Document]) -> Dict:
+        """Async ``query``: the LLM call is awaited instead of blocking a thread.
+
+        Answers are cached like ``query``; concurrent identical calls are
+        not coalesced.
+        """
+        key = self._answer_key(question, documents)
+        cached = query_cache.answers.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        
+        context = self.build_context(documents)
+        chain = self.prompt_template | self.llm
+        response = await chain.ainvoke({
+            "context": context.text,
+            "question": question
+        })
+        return dict(self._cache_answer(key, response.content, documents, context))
+    
+    async def aquery_batch(self, vector_store, questions: List[str], k: int = 3,
+                           max_concurrency: Optional[int] = None,
+                           batch_size: Optional[int] = None) -> List[Dict]:
+        """Retrieve and answer many questions; results come back in input order.
+
+        Questions are taken ``batch_size`` at a time (``QUERY_BATCH_SIZE``):
+        each batch is embedded in one call, searched concurrently and
+        answered with at most ``max_concurrency`` (``LLM_CONCURRENCY``) LLM
+        calls in flight. A question that fails gets a result with an
+        ``error`` instead of stopping the batch.
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('LLM_CONCURRENCY', '8'))
+        if batch_size is None:
+            batch_size = int(os.getenv('QUERY_BATCH_SIZE', '256'))
+        llm_slots = asyncio.Semaphore(max_concurrency)
+        
+        async def answer(question: str) -> Dict:
+            try:
+                documents = await vector_store.asearch(question, k=k)
+                async with llm_slots:
+                    return await self.aquery(question, documents)
+            except Exception as e:
+                return {"answer": None, "sources": [], "context_tokens": 0, "error": str(e)}
+        
+        results = []
+        for start in range(0, len(questions), batch_size):
+            batch = questions[start:start + batch_size]
+            unique = list(dict.fromkeys(batch))
+            # Primes the query embedding cache the searches read from
+            await asyncio.to_thread(vector_store.embed_queries, unique)
+            answers = dict(zip(unique, await asyncio.gather(*(answer(q) for q in unique))))
+            results.extend(dict(answers[question]) for question in batch)
+        return results
+    
+    def query_batch(self, vector_store, questions: List[str], k: int = 3,
+                    max_concurrency: Optional[int] = None,
+                    batch_size: Optional[int] = None) -> List[Dict]:
+        """Blocking ``aquery_batch``, for scripts and evaluation jobs."""
+        return asyncio.run(self.aquery_batch(
+            vector_store, questions, k=k, max_concurrency=max_concurrency, batch_size=batch_size
+        ))
+    
+    @traced("rag.stream_query")
+    def stream_query(self, question: str, documents: List[Document]) -> Iterator[str]:
+        """Answer a question, yielding tokens as the LLM produces them.
+
+        Sources don't depend on the answer; get them up front from
+        ``format_sources``. The finished answer is cached like ``query``,
+        and concurrent identical requests all receive one LLM stream.
+        """
+        key = self._answer_key(question, documents)
+        cached = query_cache.answers.get(key)
+        if cached is not None:
+            yield cached["answer"]
+            return
+        yield from _answer_streams.stream(key, self._stream_answer, key, question, documents)
+    
+    def _stream_answer(self, key: tuple, question: str, documents: List[Document]) -> Iterator[str]:
+        context = self.build_context(documents)
+        chain = self.prompt_template | self.llm
+        parts = []
+        for chunk in chain.stream({
+            "context": context.text,
+            "question": question
+        }):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        
+        self._cache_answer(key, "".join(parts), documents, context)
 
 
 if __name__ == "__main__":
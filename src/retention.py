@@ -0,0 +1,79 @@
+"""Periodic archiving of idle chat sessions and compaction of the chat database."""
+
+from typing import Dict, Optional
+import os
+import threading
+
+try:
+    from .database import ChatDatabase
+except ImportError:
+    from database import ChatDatabase
+
+
+def retention_days() -> Optional[int]:
+    """Days a session may sit idle before it is archived and deleted (``HISTORY_RETENTION_DAYS``).
+
+    Off (0) unless set, since archiving removes sessions from the app.
+    """
+    return int(os.getenv('HISTORY_RETENTION_DAYS', '0')) or None
+
+
+class RetentionWorker:
+    """Runs ``ChatDatabase.compact`` on a background thread every ``interval`` seconds.
+
+    With ``retain_days=None`` no session is archived, but space freed by
+    cleared sessions is still reclaimed. The first pass waits
+    ``initial_delay`` seconds so it doesn't compete with the app's
+    startup for the database.
+    """
+    
+    def __init__(self, db: ChatDatabase, retain_days: Optional[int], archive_dir: Optional[str] = "chat_archive",
+                 interval: float = 86400.0, initial_delay: float = 60.0):
+        self.db = db
+        self.retain_days = retain_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """Start the worker thread (once)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="retention-worker")
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def run_once(self) -> Dict:
+        """Archive idle sessions and reclaim space now."""
+        stats = self.db.compact(self.retain_days, self.archive_dir)
+        if stats["sessions_archived"] or stats["chunks_removed"]:
+            print(f"✓ Archived {stats['sessions_archived']} idle sessions "
+                  f"({stats['messages_archived']} messages), "
+                  f"chat database {stats['bytes_before'] // 1024} KB → {stats['bytes_after'] // 1024} KB")
+        return stats
+    
+    def _run(self):
+        if self._stop.wait(self.initial_delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠ Chat history compaction failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+
+if __name__ == "__main__":
+    # One pass, e.g. from cron: python src/retention.py
+    import json
+    
+    worker = RetentionWorker(ChatDatabase(), retention_days(),
+                             os.getenv('HISTORY_ARCHIVE_DIR', 'chat_archive'))
+    print(json.dumps(worker.run_once(), indent=2))
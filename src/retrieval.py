@@ -0,0 +1,132 @@
+"""Hybrid dense + keyword retrieval with reciprocal rank fusion."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Hashable, List, Sequence
+from langchain_core.documents import Document
+import os
+import sqlite3
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Conventional RRF constant: damps the weight of the very top ranks
+RRF_K = 60
+
+# Dense searches run here so the keyword search can overlap them
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('RETRIEVAL_WORKERS', '8')),
+    thread_name_prefix="retrieval"
+)
+
+SearchFn = Callable[[str, int], List[Document]]
+
+
+def result_key(doc: Document) -> Hashable:
+    """Identity of a chunk across result lists."""
+    if 'file_hash' in doc.metadata:
+        return doc.metadata['chunk_id']
+    return (doc.metadata.get('source'), doc.page_content)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int,
+                           rrf_k: int = RRF_K) -> List[Document]:
+    """Merge ranked lists by summing 1 / (rrf_k + rank).
+
+    Metadata from every list a chunk appears in is merged, so a fused hit
+    keeps both its dense ``score`` and its ``bm25`` score. The fused score
+    is stored as ``rrf_score``.
+    """
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = result_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            if key in documents:
+                documents[key].metadata = {**doc.metadata, **documents[key].metadata}
+            else:
+                documents[key] = doc
+    
+    fused = []
+    for key in sorted(scores, key=scores.get, reverse=True)[:k]:
+        doc = documents[key]
+        doc.metadata['rrf_score'] = round(scores[key], 6)
+        fused.append(doc)
+    return fused
+
+
+def hybrid_search(dense_search: SearchFn, lexical_search: SearchFn,
+                  query: str, k: int = 3) -> List[Document]:
+    """Run dense and keyword search concurrently and fuse the rankings.
+
+    Each side fetches a deeper candidate list than ``k`` so chunks ranked
+    moderately by both can rise above chunks only one side likes. If the
+    keyword index fails, the dense results are returned alone.
+    """
+    candidates = max(4 * k, 10)
+    dense = _executor.submit(dense_search, query, candidates)
+    try:
+        lexical = lexical_search(query, candidates)
+    except sqlite3.Error as e:
+        print(f"⚠ Keyword search failed, using dense results only: {e}")
+        lexical = []
+    return reciprocal_rank_fusion([dense.result(), lexical], k)
+
+
+def _unit(vectors) -> "np.ndarray":
+    import numpy as np
+    
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def maximal_marginal_relevance(query_vector: Sequence[float],
+                               candidate_vectors: Sequence[Sequence[float]],
+                               k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Pick ``k`` candidate indices trading relevance against redundancy.
+
+    Each step takes the candidate maximizing
+    ``lambda_mult * sim(query) - (1 - lambda_mult) * max sim(already picked)``,
+    so ``lambda_mult=1`` is plain relevance order and lower values favour
+    diversity.
+    """
+    import numpy as np
+    
+    candidates = _unit(candidate_vectors)
+    k = min(k, len(candidates))
+    if k <= 0:
+        return []
+    relevance = candidates @ _unit(query_vector)
+    
+    selected = [int(np.argmax(relevance))]
+    redundancy = candidates @ candidates[selected[0]]
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    return selected
+
+
+def redundant_tokens(documents: List[Document], shingle_size: int = 5) -> int:
+    """Count words that repeat a passage already present in an earlier document.
+
+    A word is redundant when it falls inside a ``shingle_size``-word
+    sequence seen before, which is how chunk overlap shows up in a prompt.
+    """
+    seen = set()
+    redundant = 0
+    for doc in documents:
+        words = doc.page_content.split()
+        covered = [False] * len(words)
+        shingles = [tuple(words[i:i + shingle_size])
+                    for i in range(len(words) - shingle_size + 1)]
+        for i, shingle in enumerate(shingles):
+            if shingle in seen:
+                covered[i:i + shingle_size] = [True] * shingle_size
+        redundant += sum(covered)
+        seen.update(shingles)
+    return redundant
@@ -0,0 +1,138 @@
+"""Recursive character text splitting that keeps each chunk's character offsets."""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+from langchain_core.documents import Document
+import re
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+# A chunk as a half-open [start, end) range of the source text
+Span = Tuple[int, int]
+
+
+class TextSplitter:
+    """Drop-in replacement for LangChain's ``RecursiveCharacterTextSplitter``.
+
+    Produces the same chunks for the same ``chunk_size``, ``chunk_overlap``
+    and separators (with ``length_function=len`` and separators kept at
+    the start of each piece), but works on boundary offsets into the
+    original text: pieces are never copied or joined, the merge window
+    moves by bisection rather than piece by piece, and each chunk is a
+    single slice whose offsets are known.
+    """
+    
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: Optional[Sequence[str]] = None
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators if separators is not None else DEFAULT_SEPARATORS)
+        self._patterns: Dict[str, Pattern] = {}
+    
+    def split_spans(self, text: str) -> List[Span]:
+        """Chunk boundaries as ``(start, end)`` offsets; chunk ``i`` is ``text[start:end]``."""
+        spans: List[Span] = []
+        self._split(text, 0, len(text), self.separators, spans)
+        return spans
+    
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
+    
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split each document, recording ``start_offset``/``end_offset`` in its page content."""
+        chunks = []
+        for doc in documents:
+            text = doc.page_content
+            for start, end in self.split_spans(text):
+                metadata = dict(doc.metadata, start_offset=start, end_offset=end)
+                chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        return chunks
+    
+    def _split(self, text: str, start: int, end: int, separators: List[str], out: List[Span]):
+        # The first separator present in the range, as the recursive splitter picks it
+        separator = separators[-1]
+        remaining: List[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[i + 1:]
+                break
+        
+        # Piece i is text[bounds[i]:bounds[i + 1]]
+        bounds = self._bounds(text, start, end, separator)
+        big = [i for i, (a, b) in enumerate(zip(bounds, bounds[1:])) if b - a >= self.chunk_size]
+        
+        lo = 0
+        for i in big:
+            if i > lo:
+                self._merge(text, bounds, lo, i, out)
+            if remaining:
+                self._split(text, bounds[i], bounds[i + 1], remaining, out)
+            else:
+                # Nothing left to split on: kept whole and unstripped, like LangChain
+                out.append((bounds[i], bounds[i + 1]))
+            lo = i + 1
+        if len(bounds) - 1 > lo:
+            self._merge(text, bounds, lo, len(bounds) - 1, out)
+    
+    def _bounds(self, text: str, start: int, end: int, separator: str) -> List[int]:
+        """Piece boundaries: the range split before each separator, without empty pieces."""
+        if not separator:
+            return list(range(start, end + 1))
+        pattern = self._patterns.get(separator)
+        if pattern is None:
+            pattern = self._patterns[separator] = re.compile(re.escape(separator))
+        bounds = [start]
+        bounds.extend(m.start() for m in pattern.finditer(text, start, end))
+        if len(bounds) > 1 and bounds[1] == start:
+            del bounds[1]
+        bounds.append(end)
+        return bounds
+    
+    def _merge(self, text: str, bounds: List[int], lo: int, hi: int, out: List[Span]):
+        """Merge pieces ``lo``..``hi - 1`` into chunks, as LangChain's sliding window does.
+
+        The window only depends on piece boundaries, so instead of adding
+        pieces one at a time it jumps to the next piece that overflows and
+        finds where the overlap starts by bisection.
+        """
+        size = self.chunk_size
+        overlap = self.chunk_overlap
+        first = lo
+        searched = lo + 1
+        while True:
+            # Boundary index of the first piece end that no longer fits
+            full = bisect_right(bounds, bounds[first] + size, searched, hi + 1)
+            if full > hi:
+                _emit(text, bounds[first], bounds[hi], out)
+                return
+            last = full - 1
+            _emit(text, bounds[first], bounds[last], out)
+            # Drop leading pieces until the rest fits the overlap and the new piece fits
+            first = max(
+                bisect_left(bounds, bounds[last] - overlap, first, last),
+                bisect_left(bounds, bounds[full] - size, first, last)
+            )
+            searched = full + 1
+
+
+def _emit(text: str, start: int, end: int, out: List[Span]):
+    """Append a range with surrounding whitespace trimmed, unless nothing is left."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end > start:
+        out.append((start, end))
@@ -0,0 +1,242 @@
+"""Lightweight latency tracing: timing spans, histograms and metrics export."""
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the histogram buckets, Prometheus style
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = os.getenv('NYANTA_TRACING', 'false').lower() in ('1', 'true', 'yes')
+_histograms: Dict[str, "Histogram"] = {}
+_histograms_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(flag: bool = True):
+    """Turn span recording on or off for the whole process."""
+    global _enabled
+    _enabled = flag
+
+
+class Histogram:
+    """Cumulative latency histogram over fixed buckets."""
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(self.counts):
+            upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1]
+            if bucket_count and seen + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return BUCKETS[-1]
+
+
+def observe(name: str, seconds: float):
+    """Record a duration for span ``name``."""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, Histogram())
+    histogram.observe(seconds)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def _timed_span(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def span(name: str):
+    """Context manager timing a block as ``name`` (a shared no-op when disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _timed_span(name)
+
+
+def traced(name: str) -> Callable:
+    """Decorator timing every call as span ``name``.
+
+    Generator functions are timed from the first ``next`` until they are
+    exhausted or closed, and the wait for the first item is also recorded
+    as ``<name>.first_item``. Coroutine functions are timed until they
+    complete.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def coroutine_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    observe(name, time.perf_counter() - start)
+            return coroutine_wrapper
+        
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                if not _enabled:
+                    yield from fn(*args, **kwargs)
+                    return
+                start = time.perf_counter()
+                first = True
+                try:
+                    for item in fn(*args, **kwargs):
+                        if first:
+                            observe(f"{name}.first_item", time.perf_counter() - start)
+                            first = False
+                        yield item
+                finally:
+                    observe(name, time.perf_counter() - start)
+            return generator_wrapper
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """Drop all recorded spans."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def snapshot() -> Dict[str, Dict]:
+    """Per-span summary (milliseconds) suitable for JSON."""
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    summary = {}
+    for name, histogram in items:
+        count = histogram.count
+        summary[name] = {
+            "count": count,
+            "total_ms": round(1000 * histogram.total, 3),
+            "mean_ms": round(1000 * histogram.total / count, 3) if count else 0.0,
+            "p50_ms": round(1000 * histogram.quantile(0.50), 3),
+            "p95_ms": round(1000 * histogram.quantile(0.95), 3),
+            "p99_ms": round(1000 * histogram.quantile(0.99), 3)
+        }
+    return summary
+
+
+def prometheus_text() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    lines: List[str] = [
+        "# HELP nyanta_span_seconds Duration of traced operations.",
+        "# TYPE nyanta_span_seconds histogram"
+    ]
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    for name, histogram in items:
+        with histogram._lock:
+            counts = list(histogram.counts)
+            total = histogram.total
+            count = histogram.count
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'nyanta_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'nyanta_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+        lines.append(f'nyanta_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f'nyanta_span_seconds_count{{span="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = prometheus_text().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[int]:
+    """Serve /metrics and /metrics.json from a daemon thread, once per process.
+
+    The port defaults to ``NYANTA_METRICS_PORT``; without one nothing is
+    started. The server listens on ``METRICS_HOST`` (default 127.0.0.1,
+    so it isn't reachable from other machines unless asked for).
+    Returns the bound port.
+    """
+    global _server
+    if port is None:
+        port = os.getenv('NYANTA_METRICS_PORT')
+        if not port:
+            return None
+    host = os.getenv('METRICS_HOST', '127.0.0.1')
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True,
+                             name="metrics-server").start()
+            print(f"✓ Metrics at http://{host}:{_server.server_port}/metrics")
+        return _server.server_port
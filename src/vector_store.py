@@ -1,67 +1,403 @@
-"""Pinecone vector store with OpenAI embeddings."""
+"""Vector stores with OpenAI embeddings."""
 
-from typing import List
-from langchain_pinecone import PineconeVectorStore as LangchainPinecone
-from langchain_openai import OpenAIEmbeddings
-from langchain.schema import Document
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional
+from langchain_core.documents import Document
+import asyncio
 import os
+import threading
+import uuid
 from dotenv import load_dotenv
 
+try:
+    from .coalesce import SingleFlight
+    from .embedding_cache import CachedEmbeddings
+    from .http_pool import pool_size, shared_http_client
+    from .indexing import IndexingPipeline
+    from .lexical_index import LexicalIndex
+    from .retrieval import hybrid_search, maximal_marginal_relevance
+    from .tracing import traced
+    from . import query_cache
+except ImportError:
+    from coalesce import SingleFlight
+    from embedding_cache import CachedEmbeddings
+    from http_pool import pool_size, shared_http_client
+    from indexing import IndexingPipeline
+    from lexical_index import LexicalIndex
+    from retrieval import hybrid_search, maximal_marginal_relevance
+    from tracing import traced
+    import query_cache
+
 load_dotenv()
 
+EMBEDDING_MODEL = "text-embedding-3-small"
 
-class PineconeVectorStore:
-    """Pinecone vector store with OpenAI embeddings."""
+# Identical queries from concurrent sessions share one upstream call
+_query_embeddings = SingleFlight("embed_query")
+_searches = SingleFlight("search")
+
+
+def get_secret(name: str) -> Optional[str]:
+    """Read a setting from the environment, falling back to Streamlit secrets."""
+    # Prioritize .env/os.getenv to avoid Streamlit secrets warning
+    value = os.getenv(name)
+    if not value:
+        try:
+            import streamlit as st
+            if hasattr(st, 'secrets') and name in st.secrets:
+                value = st.secrets[name]
+        except:
+            pass
+    return value
+
+
+def make_embeddings() -> CachedEmbeddings:
+    """Build the cached OpenAI embeddings client shared by all backends."""
+    from langchain_openai import OpenAIEmbeddings
     
-    def __init__(self, index_name: str = "rag-chatbot"):
-        self.index_name = index_name
+    return CachedEmbeddings(
+        OpenAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            openai_api_key=get_secret('OPENAI_API_KEY'),
+            http_client=shared_http_client()
+        ),
+        model_name=EMBEDDING_MODEL,
+        cache_path=os.getenv('EMBEDDING_CACHE_PATH', 'embedding_cache.db'),
+        max_entries=int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+    )
+
+
+def make_lexical_index(db_path: str) -> Optional[LexicalIndex]:
+    """Open the keyword index used for hybrid search, unless disabled."""
+    if os.getenv('HYBRID_SEARCH', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return LexicalIndex(db_path)
+
+
+def document_ids(documents: List[Document]) -> List[str]:
+    """Vector IDs for documents: stable chunk IDs where available.
+
+    Chunks without a file hash only carry their position, so they get a
+    random ID written into ``metadata['chunk_id']``. Later calls return
+    the same ID, so the vector and keyword indexes agree on it.
+    """
+    for doc in documents:
+        if 'file_hash' not in doc.metadata and not isinstance(doc.metadata.get('chunk_id'), str):
+            doc.metadata['chunk_id'] = str(uuid.uuid4())
+    return [doc.metadata['chunk_id'] for doc in documents]
+
+
+class BaseVectorStore(ABC):
+    """Interface shared by the retrieval backends.
+
+    API clients are built on first use (or by ``warm_up``), so creating a
+    store is cheap and never touches the network.
+    """
+    
+    _embeddings = None
+    lexical_index: Optional[LexicalIndex] = None
+    last_index_stats: Optional[Dict] = None
+    
+    # Guards lazy client construction; reentrant because clients nest
+    _client_lock = threading.RLock()
+    
+    @property
+    def embeddings(self):
+        """The embeddings client, built on first use."""
+        if self._embeddings is None:
+            with self._client_lock:
+                if self._embeddings is None:
+                    self._embeddings = make_embeddings()
+        return self._embeddings
+    
+    @embeddings.setter
+    def embeddings(self, embeddings):
+        self._embeddings = embeddings
+    
+    def warm_up(self):
+        """Build API clients ahead of the first request."""
+        self.embeddings
+    
+    def indexing_pipeline(self) -> IndexingPipeline:
+        """Build the embed/upsert pipeline, tuned from the environment."""
+        return IndexingPipeline(
+            embed_fn=self.embeddings.embed_documents,
+            upsert_fn=self._upsert_batch,
+            batch_size=int(os.getenv('EMBED_BATCH_SIZE', '64')),
+            embed_workers=int(os.getenv('EMBED_WORKERS', '2')),
+            upsert_workers=int(os.getenv('UPSERT_WORKERS', '2')),
+            queue_size=int(os.getenv('INDEX_QUEUE_SIZE', '4'))
+        )
+    
+    @traced("create_index")
+    def create_index(self, documents: Iterable[Document],
+                     on_progress: Optional[Callable[[int], None]] = None) -> int:
+        """Embed documents and upsert them into the index.
+
+        Chunks are upserted under their ``chunk_id``, so re-indexing the same
+        file overwrites its vectors instead of duplicating them. ``documents``
+        may be a lazy iterator; it is consumed while earlier batches are
+        still being embedded. Returns the number of chunks indexed.
+        """
+        print("Creating embeddings...")
+        try:
+            stats = self.indexing_pipeline().run(documents, on_progress)
+            self.flush()
+        finally:
+            query_cache.bump_index_generation()
+        self.last_index_stats = stats
+        print(f"✓ Indexed {stats['chunks']} chunks in {stats['seconds']:.2f}s "
+              f"(embed {stats['embed']['chunks_per_second']}/s, "
+              f"upsert {stats['upsert']['chunks_per_second']}/s)")
+        return stats['chunks']
+    
+    @traced("embed_query")
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing recent embeddings of the same question."""
+        model = getattr(self.embeddings, 'model_name', EMBEDDING_MODEL)
+        key = (model, query_cache.normalize_question(query))
+        vector = query_cache.query_embeddings.get(key)
+        if vector is None:
+            vector = _query_embeddings.do(key, self.embeddings.embed_query, query)
+            query_cache.query_embeddings.set(key, vector)
+        return vector
+    
+    @traced("embed_queries")
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed many search queries with one batched call.
+
+        Vectors go into the query embedding cache, so searching for these
+        queries right after doesn't embed them again.
+        """
+        model = getattr(self.embeddings, 'model_name', EMBEDDING_MODEL)
+        keys = [(model, query_cache.normalize_question(query)) for query in queries]
+        vectors = {key: query_cache.query_embeddings.get(key) for key in keys}
         
-        # Get API key (prioritize .env/os.getenv to avoid Streamlit secrets warning)
-        openai_key = os.getenv('OPENAI_API_KEY')
-        if not openai_key:
-            try:
-                import streamlit as st
-                if hasattr(st, 'secrets') and 'OPENAI_API_KEY' in st.secrets:
-                    openai_key = st.secrets['OPENAI_API_KEY']
-            except:
-                pass
+        missing = {}
+        for key, query in zip(keys, queries):
+            if vectors[key] is None and key not in missing:
+                missing[key] = query
+        if missing:
+            embed = getattr(self.embeddings, 'embed_queries', self.embeddings.embed_documents)
+            for key, vector in zip(missing, embed(list(missing.values()))):
+                vectors[key] = vector
+                query_cache.query_embeddings.set(key, vector)
+        return [vectors[key] for key in keys]
+    
+    def _upsert_batch(self, documents: List[Document], vectors: List[List[float]]):
+        """Store a batch in the vector index and the keyword index."""
+        self.upsert_vectors(documents, vectors)
+        if self.lexical_index is not None:
+            self.lexical_index.add(document_ids(documents), documents)
+    
+    def _retrieve(self, query: str, k: int) -> List[Document]:
+        """Ranked candidates: hybrid with a keyword index, dense otherwise."""
+        if self.lexical_index is None:
+            return self.dense_search(query, k)
+        return hybrid_search(self.dense_search, self.lexical_index.search, query, k)
+    
+    def candidate_vectors(self, documents: List[Document]) -> List[List[float]]:
+        """Embeddings of retrieved chunks; backends override this to read stored vectors."""
+        return self.embeddings.embed_documents([doc.page_content for doc in documents])
+    
+    @traced("search")
+    def search(self, query: str, k: int = 3, mmr: Optional[bool] = None) -> List[Document]:
+        """Search for relevant documents.
+
+        With a keyword index, dense and BM25 search run concurrently and
+        their rankings are merged with reciprocal rank fusion. With ``mmr``
+        (default from ``MMR_SEARCH``) more candidates are fetched and a
+        diverse top-k is chosen by maximal marginal relevance, so
+        overlapping neighbour chunks don't crowd out other passages.
+        Concurrent identical searches share one result.
+        """
+        if mmr is None:
+            mmr = os.getenv('MMR_SEARCH', 'false').lower() in ('1', 'true', 'yes')
+        key = (id(self), query_cache.normalize_question(query), k, mmr,
+               query_cache.index_generation())
+        return list(_searches.do(key, self._search, query, k, mmr))
+    
+    async def asearch(self, query: str, k: int = 3, mmr: Optional[bool] = None) -> List[Document]:
+        """Async ``search``; runs in a worker thread so many searches overlap."""
+        return await asyncio.to_thread(self.search, query, k, mmr)
+    
+    def _search(self, query: str, k: int, mmr: bool) -> List[Document]:
+        if not mmr:
+            return self._retrieve(query, k)
         
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=openai_key
+        candidates = self._retrieve(query, max(k, int(os.getenv('MMR_FETCH_K', '20'))))
+        if len(candidates) <= k:
+            return candidates
+        selected = maximal_marginal_relevance(
+            self.embed_query(query),
+            self.candidate_vectors(candidates),
+            k,
+            lambda_mult=float(os.getenv('MMR_LAMBDA', '0.5'))
         )
+        return [candidates[i] for i in selected]
+    
+    @abstractmethod
+    def upsert_vectors(self, documents: List[Document], vectors: List[List[float]]):
+        """Store one batch of already-embedded documents."""
+    
+    def flush(self):
+        """Persist pending writes once a create_index run finishes."""
+    
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Delete vectors by chunk ID."""
+    
+    @abstractmethod
+    def dense_search(self, query: str, k: int = 3) -> List[Document]:
+        """Search for similar documents by embedding."""
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Number of vectors in the index."""
+
+
+class PineconeVectorStore(BaseVectorStore):
+    """Pinecone vector store with OpenAI embeddings."""
+    
+    def __init__(self, index_name: str = "rag-chatbot", embeddings=None,
+                 lexical_index_path: str = "lexical_index.db"):
+        self.index_name = index_name
+        self.embeddings = embeddings
+        self.lexical_index = make_lexical_index(lexical_index_path)
         self.vector_store = None
+        self._index = None
         print(f"✓ Connected to Pinecone index: {index_name}")
     
-    def create_index(self, documents: List[Document]):
-        """Create embeddings and store in Pinecone."""
-        print(f"Creating embeddings for {len(documents)} chunks...")
-        self.vector_store = LangchainPinecone.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            index_name=self.index_name
+    def _get_store(self):
+        if not self.vector_store:
+            with self._client_lock:
+                if not self.vector_store:
+                    from langchain_pinecone import PineconeVectorStore as LangchainPinecone
+                    # Reuse our index client (and its connection pool)
+                    self.vector_store = LangchainPinecone(
+                        index=self._get_index(),
+                        embedding=self.embeddings
+                    )
+        return self.vector_store
+    
+    def _get_index(self):
+        if self._index is None:
+            with self._client_lock:
+                if self._index is None:
+                    from pinecone import Pinecone
+                    pc = Pinecone(api_key=get_secret('PINECONE_API_KEY'))
+                    # urllib3 otherwise keeps only 5 connections per CPU
+                    pc.openapi_config.connection_pool_maxsize = pool_size()
+                    self._index = pc.Index(self.index_name)
+        return self._index
+    
+    def warm_up(self):
+        """Build the embeddings and Pinecone clients ahead of the first request."""
+        super().warm_up()
+        self._get_index()
+        self._get_store()
+    
+    def upsert_vectors(self, documents: List[Document], vectors: List[List[float]]):
+        """Upsert one embedded batch into Pinecone."""
+        # LangChain's Pinecone wrapper reads chunk text from the "text" key
+        records = [
+            (id_, vector, {**doc.metadata, 'text': doc.page_content})
+            for id_, doc, vector in zip(document_ids(documents), documents, vectors)
+        ]
+        self._get_index().upsert(vectors=records)
+    
+    def flush(self):
+        """Report embedding cache usage (Pinecone upserts are immediate)."""
+        stats = self.embeddings.stats()
+        print(f"✓ Documents indexed in Pinecone "
+              f"(embedding cache: {stats['hits']} hits, {stats['misses']} misses)")
+    
+    def delete(self, ids: List[str]):
+        """Delete vectors by chunk ID."""
+        if ids:
+            self._get_store().delete(ids=ids)
+            if self.lexical_index is not None:
+                self.lexical_index.delete(ids)
+            query_cache.bump_index_generation()
+            print(f"✓ Deleted {len(ids)} stale vectors")
+    
+    @traced("search.dense")
+    def dense_search(self, query: str, k: int = 3) -> List[Document]:
+        """Search for similar documents by embedding."""
+        results = self._get_store().similarity_search_by_vector_with_score(
+            self.embed_query(query), k=k
         )
-        print("✓ Documents indexed in Pinecone")
+        for doc, score in results:
+            doc.metadata['score'] = score
+        return [doc for doc, _ in results]
     
-    def search(self, query: str, k: int = 3) -> List[Document]:
-        """Search for similar documents."""
-        if not self.vector_store:
-            self.vector_store = LangchainPinecone.from_existing_index(
-                index_name=self.index_name,
-                embedding=self.embeddings
-            )
-        results = self.vector_store.similarity_search(query, k=k)
-        return results
+    def candidate_vectors(self, documents: List[Document]) -> List[List[float]]:
+        """Stored vectors for retrieved chunks, fetched from Pinecone by ID.
+
+        Only chunks Pinecone can't return (e.g. indexed without a stable
+        ID) are embedded again.
+        """
+        ids = [doc.metadata['chunk_id'] if 'file_hash' in doc.metadata else None for doc in documents]
+        wanted = list(dict.fromkeys(id_ for id_ in ids if id_ is not None))
+        stored = self._get_index().fetch(ids=wanted).vectors if wanted else {}
+        vectors = [stored[id_].values if id_ in stored else None for id_ in ids]
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = super().candidate_vectors([documents[i] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+    
+    def count(self) -> int:
+        """Number of vectors in the Pinecone index."""
+        stats = self._get_index().describe_index_stats()
+        return stats.get('total_vector_count', 0)
+
+
+def get_vector_store(backend: Optional[str] = None) -> BaseVectorStore:
+    """Create the configured vector store backend ("pinecone", "local" or "quantized")."""
+    backend = (backend or os.getenv('VECTOR_STORE_BACKEND', 'pinecone')).lower()
+    
+    if backend == 'pinecone':
+        return PineconeVectorStore(
+            index_name=os.getenv('PINECONE_INDEX_NAME', 'rag-chatbot'),
+            lexical_index_path=os.getenv('LEXICAL_INDEX_PATH', 'lexical_index.db')
+        )
+    elif backend == 'local':
+        try:
+            from .local_vector_store import LocalVectorStore
+        except ImportError:
+            from local_vector_store import LocalVectorStore
+        return LocalVectorStore(
+            index_dir=os.getenv('LOCAL_INDEX_DIR', 'local_index'),
+            ann=os.getenv('ANN_INDEX', 'false').lower() == 'true',
+            nprobe=int(os.getenv('ANN_NPROBE', '16'))
+        )
+    elif backend == 'quantized':
+        try:
+            from .quantized_vector_store import QuantizedVectorStore
+        except ImportError:
+            from quantized_vector_store import QuantizedVectorStore
+        return QuantizedVectorStore(
+            index_dir=os.getenv('LOCAL_INDEX_DIR', 'local_index'),
+            quantization=os.getenv('VECTOR_QUANTIZATION', 'int8').lower(),
+            rescore_factor=int(os.getenv('RESCORE_FACTOR', '10')),
+            ann=os.getenv('ANN_INDEX', 'false').lower() == 'true',
+            nprobe=int(os.getenv('ANN_NPROBE', '16'))
+        )
+    else:
+        raise ValueError(f"Unsupported vector store backend: {backend}")
 
 
 if __name__ == "__main__":
     from document_loader import load_and_chunk
     
     chunks = load_and_chunk("data/sample.txt")
-    store = PineconeVectorStore()
+    store = get_vector_store()
     store.create_index(chunks)
     
     results = store.search("What is machine learning?", k=2)
     print(f"\nFound {len(results)} results:")
     if results:
-        print(results[0].page_content[:200])
\ No newline at end of file
+        print(results[0].page_content[:200])
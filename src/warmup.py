@@ -0,0 +1,44 @@
+"""Preload heavy modules and API clients off the request path."""
+
+import importlib
+import threading
+import time
+
+# Imported lazily by the app modules; loading them here moves the cost
+# to a background thread instead of the first upload or question
+HEAVY_MODULES = (
+    "langchain_community.document_loaders",
+    "pypdf",
+    "langchain_openai",
+    "langchain_pinecone",
+    "pinecone",
+    "langchain_groq",
+)
+
+
+def warm_up(*components):
+    """Import heavy modules, then build each component's clients.
+
+    Components are objects with a ``warm_up()`` method, such as a vector
+    store or a RAGChain. Failures are reported and otherwise ignored; the
+    same work simply happens again on first use.
+    """
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"⚠ Warm-up could not import {name}: {e}")
+    for component in components:
+        try:
+            component.warm_up()
+        except Exception as e:
+            print(f"⚠ Warm-up of {type(component).__name__} failed: {e}")
+    print(f"✓ Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+
+def start(*components) -> threading.Thread:
+    """Run ``warm_up`` in a daemon thread and return the thread."""
+    thread = threading.Thread(target=warm_up, args=components, daemon=True, name="warmup")
+    thread.start()
+    return thread